@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+    This script belongs to a modified reimplementation of the models described in -
+    Pyle, R. and Rosenbaum, R., 2019.
+    A reservoir computing model of reward-modulated motor learning and automaticity.
+    Neural computation, 31(7), pp.1430-1461.
+
+    This script records each completed simulation in a SQLite catalogue, with its description and summary metrics,
+    so that results can be compared across runs without loading their Data files (see query.py).
+    The catalogue file is catalogue.db, or the one given by "catalogue_file" in the task descriptor file.
+
+"""
+
+import datetime, json, sqlite3
+
+
+columns = [
+    ('date',            'TEXT'),                                                            # Date of the simulation
+    ('results_path',    'TEXT'),                                                            # Folder of the results
+    ('algorithm',       'TEXT'),
+    ('task_type',       'INTEGER'),
+    ('n_segs',          'INTEGER'),
+    ('arm_cost',        'TEXT'),                                                            # json list
+    ('rseed',           'INTEGER'),
+    ('git_hash',        'TEXT'),
+    ('experiment',      'TEXT'),                                                            # json task description
+    ('parameters',      'TEXT'),                                                            # json parameters
+    ('wall_time',       'REAL'),                                                            # Duration of training and testing in s
+    ('n_train_trials',  'INTEGER'),                                                         # No. of training trials, fewer when training stopped early or was aborted
+    ('train_error',     'REAL'),                                                            # Mean error of the last training trial
+    ('test_error',      'REAL'),                                                            # Mean error of the testing trials
+    ('trial_error',     'TEXT'),                                                            # json list of the mean error of each trial
+    ('mastery_time',    'REAL'),                                                            # Training time (ms) after which the filtered error stays below the mastery threshold
+    ('failure',         'TEXT'),                                                            # Reason of divergence of an aborted simulation (see Watchdog.py)
+    ]
+
+
+def connect(file='catalogue.db'):
+    """ Opens the catalogue, creating its table if needed. """
+
+    db = sqlite3.connect(file, timeout=60)
+    db.execute('CREATE TABLE IF NOT EXISTS runs (id INTEGER PRIMARY KEY, ' + ', '.join(c + ' ' + t for c, t in columns) + ')')
+    known = [row[1] for row in db.execute('PRAGMA table_info(runs)')]                       # Catalogues created before a column was added
+    for c, t in columns:
+        if c not in known:  db.execute('ALTER TABLE runs ADD COLUMN ' + c + ' ' + t)
+    db.execute('CREATE INDEX IF NOT EXISTS variant ON runs (algorithm, task_type, n_segs)')
+    return db
+
+
+def mastery_threshold(task_type):
+    """ Filtered error below which SUPERTREX transfers to the mastery pathway, as in ModelSUPERTREX.transfer_threshold. """
+
+    return 15e-3 if task_type > 1 else 1.5e-3
+
+
+def mastery_time(model):
+    """
+        Training time (ms) from which the error, low pass filtered online with tau_e, stays below the threshold of transfer
+        to the mastery pathway of SUPERTREX (1.5e-3 for task #1, 15e-3 otherwise); None if it is never reached.
+    """
+
+    n_timesteps = model.n_train_trials * model.n_timesteps
+    below = model.filters.below(mastery_threshold(model.task_type), model.n_train_trials-1)
+    if below == n_timesteps:    return 0.
+    if below == 0:              return None
+    return (n_timesteps - below) * model.dT
+
+
+def record(exp, parameters, model, wall_time, failure=None):
+    """
+        Inserts a completed simulation in the catalogue; the errors of an aborted one (failure) are left empty, with its no.
+        of training trials completed, and so are the training errors of batch training, whose readout is only solved at the
+        end of training.
+    """
+
+    trial_error = model.filters.trial_error
+    row = {
+        'date':         datetime.datetime.now().isoformat(timespec='seconds'),
+        'results_path': model.results_path,
+        'algorithm':    exp['algorithm'],
+        'task_type':    exp['task_type'],
+        'n_segs':       exp['n_segs'],
+        'arm_cost':     json.dumps(exp['arm_cost']),
+        'rseed':        int(model.rseed),
+        'git_hash':     str(exp['git-hash']),
+        'experiment':   json.dumps(exp, sort_keys=True),
+        'parameters':   json.dumps(parameters, sort_keys=True),
+        'wall_time':    wall_time,
+        'n_train_trials': model.n_train_trials,
+        'train_error':  float(trial_error[model.n_train_trials-1]),
+        'test_error':   float(trial_error[model.n_train_trials:].mean()),
+        'trial_error':  json.dumps(trial_error.tolist()),
+        'mastery_time': mastery_time(model),
+        'failure':      failure,
+        }
+    if failure is not None:
+        row.update(train_error=None, test_error=None, trial_error=None, mastery_time=None,
+                   n_train_trials=min(model.trial, model.n_train_trials))                  # Trials completed before the divergence
+    elif parameters.get('training', 'online') == 'batch':
+        row.update(train_error=None, mastery_time=None,
+                   trial_error=json.dumps([None] * model.n_train_trials + trial_error[model.n_train_trials:].tolist()))
+
+    db = connect(exp.get('catalogue_file', 'catalogue.db'))
+    with db:
+        db.execute('INSERT INTO runs (' + ', '.join(row) + ') VALUES (' + ', '.join('?' * len(row)) + ')', list(row.values()))
+    db.close()
@@ -13,47 +13,207 @@
     
 """
 
+import hashlib, json, os, time
+import numpy as np
+from tqdm import tqdm
+import Catalogue
 from ModelFORCE import ModelFORCE
 from ModelRMHL import ModelRMHL
 from ModelSUPERTREX import ModelSUPERTREX
 from Task import Task
+from Watchdog import Divergence
+
+
+figures = ['Overall', 'TimeSeries', 'W_norm', 'MSE', 'CoordinateX', 'CoordinateY']          # Figures plotted by all the models
 
 
 class Experiment():
     """ This object holds the description about the current simulation."""
     
-    def __init__(self, exp, parameters):
-        """ Initialize the experiment object. """
-        
+    def __init__(self, exp, parameters, repeat=None, reservoir=None):
+        """
+            Initialize the experiment object.
+            If the same run (code version, task and parameter descriptions, seed) has already been completed, its results are reused
+            (see finish).
+            With a random seed (rseed=0), runs are only reused when numbered by a repeat index.
+            The reservoir of a model built on the same seed, N, sparsity and lmbda can be reused (optional).
+        """
+
+        # Look up the run among the completed ones
+        self.key    = self.memo_key(exp, parameters, repeat)
+        self.cached = False
+        self.failure = None                                                                 # Reason of divergence, if the simulation was aborted
+        self.saved  = False                                                                 # Results saved, by this or a former run
+        self.parameters = parameters
+        if self.key is not None:
+            self.memo_file = exp['results_folder'] + '/memo/' + self.key + '.json'
+            if os.path.exists(self.memo_file):
+                _memo = json.load(open(self.memo_file))
+                self.cached = os.path.exists(_memo['results_path'])
+        if self.cached:
+            print('Reusing results in', _memo['results_path'])
+            self.results_path = _memo['results_path']
+            self.rseed = _memo['rseed']
+            self.saved = True
+            if os.path.exists(self.results_path + 'Failure.txt'):
+                self.failure = open(self.results_path + 'Failure.txt').read().strip()
+            return
+
         # Create Task and Model objects
         self.task  = Task(exp, parameters)
-        self.model = self.Model(exp, parameters)
+        self.model = self.Model(exp, parameters, reservoir)
+        self.results_path = self.model.results_path
+        self.rseed = self.model.rseed
+
+
+    def memo_key(self, exp, parameters, repeat):
+        """ Key of a run, from the code version (git-hash), the task and parameter descriptions and the seed or repeat index. """
+
+        if exp['rseed'] == 0 and repeat is None:   return None
+        if exp['rseed'] != 0:                       repeat = None
+        _run = json.dumps({'exp': exp, 'parameters': parameters, 'repeat': repeat}, sort_keys=True)
+        return hashlib.sha1(_run.encode()).hexdigest()
 
         
-    def Model(self, exp, parameters):
+    def Model(self, exp, parameters, reservoir=None):
         """ This function build a Model object depending on the learning algorithm. """
     
         _algo = exp['algorithm']
         
-        if _algo == 'FORCE':        return ModelFORCE(parameters, self.task, exp)
-        elif _algo == 'RMHL':       return ModelRMHL(parameters, self.task, exp)
-        elif _algo == 'SUPERTREX':  return ModelSUPERTREX(parameters, self.task, exp)
+        if _algo == 'FORCE':        return ModelFORCE(parameters, self.task, exp, reservoir)
+        elif _algo == 'RMHL':       return ModelRMHL(parameters, self.task, exp, reservoir)
+        elif _algo == 'SUPERTREX':  return ModelSUPERTREX(parameters, self.task, exp, reservoir)
 
         
     def run(self, exp):
         """
             This function runs the experiment,
             by training and testing the model on the task,
-            and saving the results.
+            and saving the results, which are also recorded in the catalogue.
         """
-        self.model.train(self.task)
-        self.model.test(self.task)
-        self.model.save_results(exp)
+
+        if self.cached:     return
+
+        t0 = time.perf_counter()
+        self.failure = self.step(self.model.train, self.task) or self.step(self.model.test, self.task)
+        wall_time = time.perf_counter() - t0
+        self.record(self.model, exp, self.parameters, wall_time, self.failure)
+        self.saved = True
+
+
+    def finish(self):
+        """
+            Records the run as completed, so that a relaunch reuses it. It is called once the results are saved and plotted,
+            so that a run whose plotting failed is plotted again by a relaunch.
+        """
+
+        if self.key is None or not self.saved:  return
+        if not os.path.exists(os.path.dirname(self.memo_file)):    os.makedirs(os.path.dirname(self.memo_file))
+        json.dump({'rseed': int(self.rseed), 'results_path': self.results_path}, open(self.memo_file, 'w'))
+
+
+    def step(self, f, *args):
+        """ Runs the training or testing f of a model, and returns the reason of its divergence (see Watchdog.py), or None. """
+
+        try:
+            f(*args)
+        except Divergence as e:
+            print('Simulation aborted:', e)
+            return str(e)
+
+
+    def record(self, model, exp, parameters, wall_time, failure=None):
+        """ Saves the results of a model, partial if the simulation was aborted, and records it in the catalogue. """
+
+        model.save_results(exp)
+        if failure is not None:
+            with open(model.results_path + 'Failure.txt', 'w') as f:    f.write(failure + '\n')
+        Catalogue.record(exp, parameters, model, wall_time, failure)
         
         
     def plot(self, exp):
         """ This function reroutes to the appropriate plot function, as per the task type."""
-        
+
+        if self.failure:    return
+
+        # Reused results are only plotted if their figures are missing, by a model built again on their seed
+        if self.cached:
+            if all(os.path.exists(self.results_path + f + '.' + exp['plot_format']) for f in figures):  return
+            self.task  = Task(exp, self.parameters)
+            self.model = self.Model(dict(exp, rseed=self.rseed), self.parameters)
+
         self.model.plot(exp, self.task)                 # Plots 1 overall figure with all the information; Can be commented out
         self.model.plot_distinct(exp, self.task)        # Plots individual figures; Can be commented out
 
+
+class Comparison(Experiment):
+    """
+        This object holds several simulations of the same task (e.g. FORCE, RMHL and SUPERTREX),
+        built on one seed and reservoir, and trained in lockstep on a common stream of random numbers.
+    """
+
+    def __init__(self, exps, parameters):
+        """ Initialize the comparison object. """
+
+        # Resolve the seed once, for all the simulations
+        rseed = exps[0]['rseed']
+        if rseed == 0:  rseed = np.random.randint(0,1e7)
+        self.exps = [dict(exp, rseed=rseed) for exp in exps]
+        self.parameters = parameters
+        self.failures = [None] * len(exps)                                                  # Reason of divergence of each model, if aborted
+
+        # Create Task object once, and Model objects sharing the reservoir of the first one
+        self.task   = Task(self.exps[0], parameters[0])
+        self.models = []
+        for exp, params in zip(self.exps, parameters):
+            reservoir = self.models[0] if self.models else None
+            self.models.append(self.Model(exp, params, reservoir))
+
+
+    def run(self):
+        """
+            This function trains the models in lockstep, each timestep drawing the noise once for all of them
+            (common random numbers), then tests the models and saves their results in their own results folders.
+            As training is shared, the wall time recorded in the catalogue for each model is that of the whole training
+            and of its own testing.
+            The exploratory noise is drawn even if no model uses it, so that RMHL and SUPERTREX see the same
+            noise as in their individual simulations with this seed.
+            With early stopping, training stops once all the models have converged.
+            A model that diverges is aborted, and the others go on.
+        """
+
+        _m = self.models[0]
+        t0 = time.perf_counter()
+
+        # Online training
+        print('Training')
+        for trial_num in tqdm(range(_m.n_train_trials)):
+            for time_step in range(_m.n_timesteps):
+                u_r = np.random.uniform(0, 1, (_m.N, 1))
+                u_z = np.random.uniform(0, 1, (_m.n_out, 1))
+                for i, model in enumerate(self.models):
+                    if self.failures[i] is None:    self.failures[i] = self.step(model.train_step, self.task, trial_num, time_step, u_r, u_z)
+            for model, failure in zip(self.models, self.failures):
+                if failure is None:         model.end_trial(trial_num, 'train')
+            running = [model for model, failure in zip(self.models, self.failures) if failure is None]
+            if all(model.converged(trial_num) for model in running):
+                for model in running:       model.stop(trial_num)
+                break
+        print('Training done')
+
+        for model in self.models:   model.profile.end('train', t0)                          # Shared by the models
+        t_train = time.perf_counter() - t0
+        for i, (model, exp, params) in enumerate(zip(self.models, self.exps, self.parameters)):
+            t0 = time.perf_counter()
+            if self.failures[i] is None:    self.failures[i] = self.step(model.test, self.task)
+            wall_time = t_train + time.perf_counter() - t0
+            self.record(model, exp, params, wall_time, self.failures[i])
+
+
+    def plot(self):
+        """ This function plots the results of each model. """
+
+        for model, exp, failure in zip(self.models, self.exps, self.failures):
+            if failure:     continue
+            model.plot(exp, self.task)
+            model.plot_distinct(exp, self.task)
@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+    This script belongs to a modified reimplementation of the models described in -
+    Pyle, R. and Rosenbaum, R., 2019.
+    A reservoir computing model of reward-modulated motor learning and automaticity.
+    Neural computation, 31(7), pp.1430-1461.
+
+    This script profiles the phases of a simulation: the wall time, no. of calls and peak memory of the building of the model,
+    training, testing, saving and plotting, and of the parts of each timestep (RLS update, Task.norm of the weights, recording)
+    and of each trial (low pass filters). The profile is written next to the results, in Profile.json, as
+        {"<phase>": {"time": <s>, "calls": <n>, "peak_rss_mb": <MB>}, ...}
+    where the sub-phases of a phase are named <phase>.<sub-phase>, and peak_rss_mb, the peak resident memory of the process
+    at the end of the phase, is only given for the phases that are not timesteps or trials.
+
+"""
+
+import collections, functools, json, sys
+from time import perf_counter as clock
+
+try:
+    import resource
+except ImportError:                                                                         # Not available on Windows
+    resource = None
+
+
+def peak_rss():
+    """ Peak resident memory of the process so far, in MB (None if not available). """
+
+    if resource is None:    return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss / 2**20 if sys.platform == 'darwin' else rss / 2**10                         # Bytes on macOS, kB on Linux
+
+
+def profiled(phase, write=False):
+    """ Profiles a method of a model as a phase, and writes the profile to the results folder after it if write. """
+
+    def decorator(f):
+        @functools.wraps(f)
+        def wrapper(model, *args, **kwargs):
+            t0 = clock()
+            try:
+                return f(model, *args, **kwargs)
+            finally:
+                model.profile.end(phase, t0)
+                if write:   model.profile.write(model.results_path + 'Profile.json')
+        return wrapper
+    return decorator
+
+
+class Profile:
+    """ Wall time, no. of calls and peak memory of the phases of a simulation. """
+
+    def __init__(s):                                                                        # self -> s
+        s.time  = collections.defaultdict(float)
+        s.calls = collections.defaultdict(int)
+        s.rss   = {}
+
+
+    def add(s, phase, t0):
+        """ Adds a call of a phase started at t0 (clock()), and returns the current time, e.g. to start the next phase. """
+
+        t = clock()
+        s.time[phase]  += t - t0
+        s.calls[phase] += 1
+        return t
+
+
+    def end(s, phase, t0):
+        """ Adds a call of a phase started at t0, with the peak memory of the process at its end. """
+
+        s.add(phase, t0)
+        s.rss[phase] = peak_rss()
+
+
+    def write(s, file):
+        """ Writes the profile as json. """
+
+        profile = {}
+        for phase in sorted(s.time):
+            profile[phase] = {'time': s.time[phase], 'calls': s.calls[phase]}
+            if s.rss.get(phase) is not None:    profile[phase]['peak_rss_mb'] = s.rss[phase]
+        with open(file, 'w') as f:
+            json.dump(profile, f, indent=4)
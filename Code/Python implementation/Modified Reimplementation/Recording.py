@@ -0,0 +1,647 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+    This script belongs to a modified reimplementation of the models described in -
+    Pyle, R. and Rosenbaum, R., 2019.
+    A reservoir computing model of reward-modulated motor learning and automaticity.
+    Neural computation, 31(7), pp.1430-1461.
+
+    This script saves and loads the results of the models.
+    The traces (z, z_RMHL, z_FORCE, hz) are recorded time-major, as (n_total_trials, n_timesteps, n_out),
+    so that each timestep is written contiguously and a trace can be viewed as (n_out, n_total_trials*n_timesteps) without copy.
+
+    Results are saved either in a single Data.npz file (default), or in a Data folder with one file per array,
+    as chosen in the experiment file by:
+        results_format      : npz or npy (one file per array)
+        results_compression : none or zlib (lossless, one chunk per trial, compressed in parallel threads; npy only)
+        results_trace_dtype : float64, float32 or float16 precision of the saved traces (optional)
+    Arrays in the Data folder are only read when accessed: uncompressed arrays are memory-mapped,
+    and only the chunks of the requested trials of compressed arrays are decompressed.
+    To convert saved Data.npz files: python3 Recording.py <results_folder> [--compression=zlib] [--trace_dtype=float32]
+
+    The low pass filtered traces plotted by the models (error_bar, cost_bar, z_bar, hz_bar, ...) and per-trial aggregates
+    are computed online, at the end of each trial, and saved with the raw traces, which can be left out with
+        results_raw         : Yes or No (save the raw traces error, cost, z, z_RMHL, z_FORCE and hz, optional)
+
+    The models stream the traces of each trial at its end to a recorder: in memory for Data.npz, or to the Data folder
+    for results_format npy, so that the memory of a simulation does not grow with its no. of trials.
+    Long simulations can keep only their last trials at full resolution, and the former ones decimated, with
+        results_window      : no. of last trials saved at full resolution (optional, default all)
+        results_decimate    : the other trials are saved every results_decimate timesteps, or only as per-trial
+                              aggregates if 0 (optional, default 10)
+    load_results returns the traces of such results at full size, the decimated timesteps being repeated (NaN if 0).
+    The reservoir activity r can be recorded projected onto k dimensions (see Projection), as r_proj, with
+        results_projection      : random or pca basis of the projection (optional, default none)
+        results_projection_dim  : no. of dimensions k (optional, default 10)
+    The readout weights can be saved every few training timesteps, in the Weights folder (see Snapshots), with
+        results_weights     : no. of training timesteps between two snapshots of the weights (optional, default none)
+    which load_weights reads back.
+
+"""
+
+import argparse, io, json, os, zlib
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+from scipy import signal
+
+
+traces = ['z', 'z_RMHL', 'z_FORCE', 'hz', 'z_bar', 'z_RMHL_bar', 'z_FORCE_bar', 'hz_bar']   # Arrays recorded at every timestep for each output
+raw    = ['error', 'cost', 'z', 'z_RMHL', 'z_FORCE', 'hz']                                  # Arrays not needed by the plots, given the filtered ones
+
+
+def write_results(path, arrays, exp, index=None):
+    """
+        Saves the arrays of a simulation in path.npz, or in the folder path, as per the experiment file.
+        index holds the arrays already written to the folder, e.g. by a Writer.
+    """
+
+    _format     = exp.get('results_format', 'npz')
+    compression = exp.get('results_compression', 'none')
+    trace_dtype = exp.get('results_trace_dtype', None)
+
+    if exp.get('results_raw', 'Yes') == 'No':
+        arrays = {key: a for key, a in arrays.items() if key not in raw}
+    if trace_dtype is not None:
+        arrays = {key: a.astype(trace_dtype) if key.replace('_decimated', '') in traces else a for key, a in arrays.items()}
+
+    if _format == 'npz':
+        np.savez(path, **arrays)
+        return
+
+    if not os.path.exists(path):   os.makedirs(path)
+    index = dict(index or {})
+    for key, a in arrays.items():
+        index[key] = {'dtype': a.dtype.str, 'shape': a.shape, 'chunks': None}
+
+        if compression == 'none':
+            np.save(os.path.join(path, key + '.npy'), a)
+
+        # One compressed chunk per trial, so that trials can be read separately
+        else:
+            with ThreadPoolExecutor() as pool:
+                chunks = list(pool.map(zlib.compress, [np.ascontiguousarray(a[i]).tobytes() for i in range(a.shape[0])]))
+            with open(os.path.join(path, key + '.zlib'), 'wb') as f:
+                for chunk in chunks:    f.write(chunk)
+            index[key]['chunks'] = [len(chunk) for chunk in chunks]
+
+    with open(os.path.join(path, 'index.json'), 'w') as f:
+        json.dump(index, f)
+
+
+def load_results(path, trials=slice(None)):
+    """
+        Loads the results saved in path.npz, or in the folder path, restricted to a slice of trials.
+        The arrays are read when accessed, e.g. load_results(path)['error'].
+    """
+
+    if path.endswith('.npz'):   path = path[:-4]
+    return Results(path, trials)
+
+
+class Results:
+    """ Arrays of the results of a simulation, read lazily. """
+
+    def __init__(s, path, trials=slice(None)):                                               # self -> s
+        """ Opens the results saved in path.npz, or in the folder path. """
+
+        s.path   = path
+        s.trials = trials
+        if os.path.isdir(path):
+            with open(os.path.join(path, 'index.json')) as f:
+                s.index = json.load(f)
+            s.npz = None
+        else:
+            s.npz = np.load(path + '.npz')
+            s.index = {key: None for key in s.npz.files}
+
+
+    def keys(s):
+        return s.index.keys()
+
+
+    def __contains__(s, key):
+        return key in s.index
+
+
+    def __getitem__(s, key):
+        """
+            Reads an array, for the selected trials only. The traces of results saved with a window (see Ring) are put back
+            together: the trials of the window at full resolution, the former ones from their decimated timesteps.
+        """
+
+        if key + '_decimated' not in s.index:   return s.read(key, s.trials)
+
+        first, n_timesteps, decimate = (int(v) for v in s.read('window'))
+        decimated = s.read(key + '_decimated')
+        trials = np.arange(len(decimated))[s.trials]
+        a = np.full((len(trials), n_timesteps) + decimated.shape[2:], np.nan, dtype=decimated.dtype)
+        if decimate:    a[:] = np.repeat(decimated[trials], decimate, axis=1)[:, :n_timesteps]
+        window = trials >= first
+        if window.any():    a[window] = s.read(key)[trials[window] - first]
+        return a
+
+
+    def n_trials(s, key):
+        """ No. of trials of an array. """
+
+        if key + '_decimated' in s.index:   key += '_decimated'
+        if s.npz is not None:   return len(s.read(key))
+        return s.index[key]['shape'][0]
+
+
+    def read(s, key, trials=slice(None)):
+        """ Reads an array as saved, for a slice of trials. """
+
+        # Single file; traces saved in the former layout (n_out, n_total_trials, n_timesteps, 1) are returned as time-major views
+        if s.npz is not None:
+            a = s.npz[key]
+            if a.ndim == 4:     a = np.moveaxis(a[..., 0], 0, -1)
+            return a[trials]
+
+        # One file per array, memory-mapped
+        info = s.index[key]
+        if info['chunks'] is None:
+            return np.load(os.path.join(s.path, key + '.npy'), mmap_mode='r')[trials]
+
+        # One compressed chunk per trial
+        offsets = np.concatenate(([0], np.cumsum(info['chunks'])))
+        trials = range(*trials.indices(info['shape'][0]))
+        a = np.empty((len(trials),) + tuple(info['shape'][1:]), dtype=info['dtype'])
+        with open(os.path.join(s.path, key + '.zlib'), 'rb') as f:
+            for i, trial in enumerate(trials):
+                f.seek(offsets[trial])
+                a[i] = np.frombuffer(zlib.decompress(f.read(info['chunks'][trial])), dtype=info['dtype']).reshape(a.shape[1:])
+        return a
+
+
+def recorder(fields, n_total_trials, n_timesteps, path, exp):
+    """
+        Recorder of the traces of a simulation, saved in path: a Ring for a results_window, a Writer for results_format npy,
+        a Recorder otherwise.
+    """
+
+    if exp.get('results_window') is not None:       return Ring(fields, n_total_trials, n_timesteps, path, exp)
+    if exp.get('results_format', 'npz') == 'npy':   return Writer(fields, n_total_trials, n_timesteps, path, exp)
+    return Recorder(fields, n_total_trials, n_timesteps, path, exp)
+
+
+class Recorder:
+    """ Traces of the trials of a simulation, streamed at the end of each trial, in memory until they are saved. """
+
+    def __init__(s, fields, n_total_trials, n_timesteps, path, exp):
+        """
+            fields  : dict of the (shape, dtype) of a timestep of each trace, by name of the saved array
+            path    : path of the saved results, without extension
+        """
+
+        s.path, s.exp = path, exp
+        s.arrays = {key: np.zeros((n_total_trials, n_timesteps) + shape, dtype=dtype) for key, (shape, dtype) in fields.items()
+                    if exp.get('results_raw', 'Yes') == 'Yes' or key not in raw}
+
+
+    def write(s, trial_num, trial):
+        """ Records the traces of a trial, as a dict of arrays (n_timesteps[, n_out]); the traces not recorded are skipped. """
+
+        for key, a in trial.items():
+            if key in s.arrays:     s.arrays[key][trial_num] = a
+
+
+    def trim(s, n_total_trials):
+        """ Drops the trials from n_total_trials on, when training stops early. """
+
+        s.arrays = {key: a[:n_total_trials] for key, a in s.arrays.items()}
+
+
+    def save(s, arrays):
+        """ Saves the traces with the other arrays of the simulation (e.g. per-trial aggregates). """
+
+        write_results(s.path, dict(s.arrays, **arrays), s.exp)
+
+
+class Writer(Recorder):
+    """
+        Traces of the trials of a simulation written to the Data folder as they are streamed (results_format npy), one trial
+        at a time: uncompressed arrays at the offset of the trial in their .npy file, compressed ones as one chunk per trial,
+        so that only the trial being written is held in memory. The files are only created by the first trial, so that
+        building a model does not overwrite saved results.
+    """
+
+    def __init__(s, fields, n_total_trials, n_timesteps, path, exp):
+        trace_dtype  = exp.get('results_trace_dtype', None)
+        s.path, s.exp = path, exp
+        s.fields     = {key: (shape, np.dtype(trace_dtype if key in traces and trace_dtype else dtype)) for key, (shape, dtype) in fields.items()
+                        if exp.get('results_raw', 'Yes') == 'Yes' or key not in raw}
+        s.compressed = exp.get('results_compression', 'none') == 'zlib'
+        s.shape      = (n_total_trials, n_timesteps)
+        s.files      = None
+        s.chunks     = {key: [] for key in s.fields}                                        # Sizes of the compressed chunks of the trials
+
+
+    def open(s):
+        if not os.path.exists(s.path):  os.makedirs(s.path)
+        s.files, s.offsets = {}, {}
+        for key, (shape, dtype) in s.fields.items():
+            if s.compressed:
+                s.files[key] = open(os.path.join(s.path, key + '.zlib'), 'wb')
+            else:
+                s.files[key] = f = open(os.path.join(s.path, key + '.npy'), 'wb+')
+                s.header(f, dtype, s.shape + shape)
+                s.offsets[key] = f.tell()
+                f.truncate(s.offsets[key] + s.trial_bytes(key) * s.shape[0])                 # Trials not simulated are zeros
+
+
+    @staticmethod
+    def header(f, dtype, shape):
+        np.lib.format.write_array_header_1_0(f, {'descr': np.lib.format.dtype_to_descr(dtype), 'fortran_order': False, 'shape': shape})
+
+
+    def trial_bytes(s, key):
+        shape, dtype = s.fields[key]
+        return int(np.prod(s.shape[1:] + shape)) * dtype.itemsize
+
+
+    def append(s, key, a):
+        """ Appends a trial to a compressed trace. """
+
+        chunk = zlib.compress(np.ascontiguousarray(a, dtype=s.fields[key][1]).tobytes())
+        s.files[key].write(chunk)
+        s.chunks[key].append(len(chunk))
+
+
+    def fill(s, key, n_trials):
+        """ Completes a compressed trace up to n_trials with the trials not simulated (zeros, e.g. after a divergence). """
+
+        while len(s.chunks[key]) < n_trials:    s.append(key, np.zeros(s.shape[1:] + s.fields[key][0]))
+
+
+    def write(s, trial_num, trial):
+        if s.files is None:     s.open()
+        for key in s.fields:
+            if key not in trial:    continue
+            if s.compressed:
+                s.fill(key, trial_num)
+                s.append(key, trial[key])
+            else:
+                s.files[key].seek(s.offsets[key] + trial_num * s.trial_bytes(key))
+                s.files[key].write(np.ascontiguousarray(trial[key], dtype=s.fields[key][1]).tobytes())
+
+
+    def trim(s, n_total_trials):
+        s.shape = (n_total_trials,) + s.shape[1:]
+
+
+    def save(s, arrays):
+        if s.files is None:     s.open()
+        index = {}
+        for key, (shape, dtype) in s.fields.items():
+            if s.compressed:    s.fill(key, s.shape[0])
+            else:               s.resize(key)
+            s.files[key].close()
+            index[key] = {'dtype': dtype.str, 'shape': s.shape + shape, 'chunks': s.chunks[key][:s.shape[0]] if s.compressed else None}
+        s.files = None
+        write_results(s.path, arrays, s.exp, index)
+
+
+    def resize(s, key):
+        """
+            Rewrites the header of an uncompressed trace for its no. of trials, which is smaller if training stopped early,
+            moving the trials one at a time if the length of the header changed, and drops the later trials.
+        """
+
+        f, (shape, dtype) = s.files[key], s.fields[key]
+        header = io.BytesIO()
+        s.header(header, dtype, s.shape + shape)
+        header = header.getvalue()
+        n_trials, size, offset = s.shape[0], s.trial_bytes(key), len(header)
+        if offset != s.offsets[key]:
+            for trial_num in (range(n_trials) if offset < s.offsets[key] else range(n_trials-1, -1, -1)):
+                f.seek(s.offsets[key] + trial_num * size)
+                chunk = f.read(size)
+                f.seek(offset + trial_num * size)
+                f.write(chunk)
+        f.seek(0)
+        f.write(header)
+        f.truncate(offset + n_trials * size)
+
+
+class Ring(Recorder):
+    """
+        Traces of the last results_window trials of a simulation at full resolution, in a ring buffer of as many trials,
+        and of all its trials every results_decimate timesteps (none if 0), so that the memory of a long simulation only
+        grows with the decimated traces. They are saved as <key> for the window, <key>_decimated for the decimated trials,
+        and window, the first trial of the window, no. of timesteps and decimation, which load_results puts back together.
+    """
+
+    def __init__(s, fields, n_total_trials, n_timesteps, path, exp):
+        s.path, s.exp = path, exp
+        s.n_total_trials, s.n_timesteps = n_total_trials, n_timesteps
+        s.n_window = min(exp['results_window'], n_total_trials)
+        s.decimate = exp.get('results_decimate', 10)
+        fields     = {key: field for key, field in fields.items() if exp.get('results_raw', 'Yes') == 'Yes' or key not in raw}
+        n_kept     = -(-n_timesteps // s.decimate) if s.decimate else 0                     # No. of decimated timesteps of a trial
+        s.arrays    = {key: np.zeros((s.n_window, n_timesteps) + shape, dtype=dtype) for key, (shape, dtype) in fields.items()}
+        s.held      = {key: np.full(s.n_window, -1) for key in fields}                      # Trial held by each slot of the ring
+        s.decimated = {key: np.zeros((n_total_trials, n_kept) + shape, dtype=dtype) for key, (shape, dtype) in fields.items()}
+
+
+    def write(s, trial_num, trial):
+        for key, a in trial.items():
+            if key not in s.arrays:     continue
+            s.arrays[key][trial_num % s.n_window] = a
+            s.held[key][trial_num % s.n_window]   = trial_num
+            s.decimated[key][trial_num] = a[::s.decimate] if s.decimate else a[:0]
+
+
+    def trim(s, n_total_trials):
+        s.n_total_trials = n_total_trials
+        s.decimated = {key: a[:n_total_trials] for key, a in s.decimated.items()}
+
+
+    def save(s, arrays):
+        first  = max(0, s.n_total_trials - s.n_window)
+        trials = np.arange(first, s.n_total_trials)
+        window = {}
+        for key, a in s.arrays.items():
+            window[key] = a[trials % s.n_window]
+            window[key][s.held[key][trials % s.n_window] != trials] = 0                     # Trials not simulated, e.g. after a divergence
+        decimated = {key + '_decimated': a for key, a in s.decimated.items()}
+        write_results(s.path, dict(window, window=np.array([first, s.n_timesteps, s.decimate]), **decimated, **arrays), s.exp)
+
+
+class Projection:
+    """
+        Projection of the reservoir activity r onto k dimensions, recorded at every timestep as r_proj = basis.T r: onto a
+        fixed random orthonormal basis (random), or onto the k leading principal components of r (pca), learnt incrementally
+        from blocks of k timesteps by a truncated SVD (Ross et al., 2008) and updated at the end of each trial, so that each
+        trial is projected onto a single basis. The memory and time per timestep are O(Nk). The basis (N, k) is saved as
+        r_basis, or for pca the basis of each trial (n_total_trials, N, k) with the mean of r learnt before it, as r_mean
+        (n_total_trials, N), so that the centred trajectory of a trial is r_proj - r_mean.dot(r_basis).
+    """
+
+    def __init__(s, kind, N, k, rseed, dtype):
+        """
+            kind    : random or pca
+            rseed   : seed of the random basis, the first one of pca, drawn apart from the random numbers of the simulation
+        """
+
+        s.kind, s.k = kind, k
+        s.basis   = np.linalg.qr(np.random.RandomState(rseed).standard_normal((N, k)))[0].astype(dtype)
+        s.history = {}                                                                      # Basis and mean of r of each trial (pca)
+        if kind == 'pca':
+            s.n, s.mean = 0, np.zeros(N)                                                    # No. of timesteps learnt from, and their mean
+            s.components, s.singular = np.zeros((0, N)), np.zeros(0)
+            s.block, s.n_block = np.zeros((k, N)), 0                                        # Timesteps not learnt from yet
+
+
+    def step(s, r, trial_num, time_step):
+        """ Projection of the activity r (N, 1) at a timestep, which pca learns from. """
+
+        if s.kind == 'pca':
+            if time_step == 0:  s.history[trial_num] = (s.basis, s.mean)
+            s.block[s.n_block] = r[:, 0]
+            s.n_block += 1
+            if s.n_block == s.k:    s.learn()
+        return s.basis.T.dot(r)[:, 0]
+
+
+    def learn(s):
+        """ Updates the principal components with the block of timesteps, correcting for the change of the mean. """
+
+        X, n = s.block[:s.n_block], s.n
+        mean = X.mean(axis=0)
+        rows = [s.singular[:, None] * s.components, X - mean]
+        if n:   rows.append(np.sqrt(n * len(X) / (n + len(X))) * (s.mean - mean)[None])
+        _, singular, components = np.linalg.svd(np.vstack(rows), full_matrices=False)
+        s.components, s.singular = components[:s.k], singular[:s.k]
+        s.mean = s.mean + len(X) / (n + len(X)) * (mean - s.mean)
+        s.n, s.n_block = n + len(X), 0
+
+
+    def end_trial(s):
+        """ Basis of pca for the next trial: the principal components, each of sign such that its largest value is positive. """
+
+        if s.kind != 'pca':     return
+        if s.n_block:   s.learn()
+        if len(s.components) < s.k:     return                                              # Fewer timesteps than k so far
+        s.components *= np.sign(s.components[np.arange(s.k), np.argmax(np.abs(s.components), axis=1)])[:, None]
+        s.basis = s.components.T.astype(s.basis.dtype)
+
+
+    def arrays(s, n_total_trials):
+        """ Basis (and mean of r) of the projection, by name of the saved array. """
+
+        if s.kind == 'random':  return {'r_basis': s.basis}
+        bases = np.zeros((n_total_trials,) + s.basis.shape, dtype=s.basis.dtype)
+        means = np.zeros((n_total_trials, len(s.basis)))
+        for trial_num, (basis, mean) in s.history.items():
+            if trial_num < n_total_trials:  bases[trial_num], means[trial_num] = basis, mean
+        return {'r_basis': bases, 'r_mean': means}
+
+
+class Snapshots:
+    """
+        Snapshots of the readout weights (e.g. W_RMHL, W_FORCE) every results_weights training timesteps, written to the
+        Weights folder as they are taken, so that only the last one is held in memory. Each snapshot is stored as its
+        difference from the previous one in float32, with the bytes of its values shuffled (the first byte of all the
+        values, then the second, ...) and compressed with zlib, one chunk per snapshot: the differences are small, so that
+        their sign and exponent bytes compress well. A difference is taken from the previous snapshot as decoded, so that
+        rounding errors do not accumulate. The files are only created by the first snapshot, so that building a model does
+        not overwrite saved results; index.json holds the training timestep of each snapshot and the sizes of the chunks.
+    """
+
+    def __init__(s, path, every, keys, shape):
+        """
+            every   : no. of training timesteps between two snapshots
+            keys    : names of the weights, as attributes of the model
+            shape   : shape of the weights (n_out, n_readout)
+        """
+
+        s.path, s.every, s.keys, s.shape = path, every, keys, shape
+        s.last   = {key: np.zeros(shape, dtype=np.float32) for key in keys}                 # Previous snapshot, as decoded
+        s.chunks = {key: [] for key in keys}                                                # Sizes of the compressed chunks
+        s.steps  = []                                                                       # Training timestep of each snapshot
+        s.files  = None
+
+
+    def open(s):
+        if not os.path.exists(s.path):  os.makedirs(s.path)
+        s.files = {key: open(os.path.join(s.path, key + '.zlib'), 'wb') for key in s.keys}
+
+
+    @staticmethod
+    def shuffle(a):
+        return np.ascontiguousarray(a, dtype='<f4').view(np.uint8).reshape(-1, 4).T.tobytes()
+
+
+    @staticmethod
+    def unshuffle(b, shape):
+        return np.frombuffer(b, dtype=np.uint8).reshape(4, -1).T.copy().view('<f4').reshape(shape)
+
+
+    def step(s, model, step):
+        """ Takes a snapshot of the weights of a model after training timestep step (counted from the first trial), if due. """
+
+        if (step+1) % s.every:  return
+        if s.files is None:     s.open()
+        for key in s.keys:
+            delta = getattr(model, key).astype(np.float32) - s.last[key]
+            s.last[key] += delta
+            chunk = zlib.compress(s.shuffle(delta))
+            s.files[key].write(chunk)
+            s.chunks[key].append(len(chunk))
+        s.steps.append(step)
+
+
+    def save(s):
+        """ Closes the files of the snapshots and writes their index. """
+
+        if s.files is None:     s.open()
+        for f in s.files.values():  f.close()
+        s.files = None
+        with open(os.path.join(s.path, 'index.json'), 'w') as f:
+            json.dump({'every': s.every, 'shape': s.shape, 'steps': s.steps, 'chunks': s.chunks}, f)
+
+
+def load_weights(path):
+    """
+        Loads the snapshots of the readout weights saved in the folder path (see Snapshots), as float32 arrays
+        (n_snapshots, n_out, n_readout) by name, with the training timestep of each snapshot as steps.
+    """
+
+    with open(os.path.join(path, 'index.json')) as f:
+        index = json.load(f)
+    weights = {'steps': np.array(index['steps'], dtype=int)}
+    shape   = tuple(index['shape'])
+    for key, chunks in index['chunks'].items():
+        a = weights[key] = np.zeros((len(chunks),) + shape, dtype=np.float32)
+        w = np.zeros(shape, dtype=np.float32)
+        with open(os.path.join(path, key + '.zlib'), 'rb') as f:
+            for i, size in enumerate(chunks):
+                w += Snapshots.unshuffle(zlib.decompress(f.read(size)), shape)
+                a[i] = w
+    return weights
+
+
+class Filters:
+    """
+        Low pass filters of the recorded traces, as plotted, and per-trial aggregates, updated at the end of each trial
+        from its timesteps, so that the plots and the catalogue do not need to filter the full traces.
+        The error and cost are filtered with rate c_e (tau_e), the outputs with rate c_z.
+    """
+
+    def __init__(s, keys, shape, c_e, c_z, thresholds=()):
+        """
+            keys        : names of the filtered traces
+            shape       : no. of trials and of timesteps per trial (n_total_trials, n_timesteps)
+            c_e, c_z    : rates of the low pass filters of the error and cost, and of the outputs
+            thresholds  : thresholds of the filtered error (e.g. stop_error), for Filters.below (None are ignored)
+        """
+
+        s.keys = keys
+        n_total_trials, s.n_timesteps = shape
+        s.c_e, s.c_z = c_e, c_z
+        s.last = {}                                                                         # Filtered values at the end of the previous trial
+
+        s.trial_error  = np.zeros(n_total_trials)                                           # Mean error of each trial
+        s.final_error  = np.zeros(n_total_trials)                                           # Filtered error at the end of each trial
+        s.trial_cost   = np.zeros(n_total_trials)                                           # Mean cost of each trial
+        if 'z_FORCE' in keys and 'z_RMHL' in keys:
+            s.mastery_ratio = np.zeros(n_total_trials)                                      # Mean norm of the mastery over exploratory output
+        s.above = {threshold: np.zeros(n_total_trials, dtype=int) for threshold in thresholds if threshold is not None}
+
+
+    def update(s, trial_num, trial):
+        """
+            Filters the timesteps of a trial, given as a dict of arrays (n_timesteps[, n_out]), continuing from the end of
+            the previous one, and returns the filtered traces of the trial, by name of the saved array.
+        """
+
+        bar = {}
+        for key in s.keys:
+            x = np.asarray(trial[key], dtype=float)
+            c = s.c_e if key in ['error', 'cost'] else s.c_z
+            y = s.last.get(key, x[0])
+            y, _ = signal.lfilter([c], [1, c - 1], x, axis=0, zi=(1 - c) * np.reshape(y, (1,) + x.shape[1:]))
+            bar[key + '_bar'] = y.astype(trial[key].dtype, copy=False)                      # Filtered as recorded
+            s.last[key] = bar[key + '_bar'][-1]
+
+        error_bar = bar['error_bar']
+        s.trial_error[trial_num] = np.mean(trial['error'])
+        s.final_error[trial_num] = error_bar[-1]
+        s.trial_cost[trial_num]  = np.mean(trial['cost'])
+        if hasattr(s, 'mastery_ratio'):
+            with np.errstate(divide='ignore', invalid='ignore'):                            # No exploratory output while testing
+                s.mastery_ratio[trial_num] = np.linalg.norm(trial['z_FORCE'], axis=1).mean() / \
+                                             np.linalg.norm(trial['z_RMHL'], axis=1).mean()
+        for threshold, above in s.above.items():
+            _above = np.nonzero(error_bar >= threshold)[0]
+            above[trial_num] = _above[-1] + 1 if len(_above) else 0                         # No. of timesteps up to the last one above
+        return bar
+
+
+    def below(s, threshold, trial_num):
+        """ No. of timesteps up to the end of trial trial_num for which the filtered error has stayed below threshold. """
+
+        above = np.nonzero(s.above[threshold][:trial_num+1])[0]
+        if len(above) == 0:     return (trial_num + 1) * s.n_timesteps
+        return (trial_num - above[-1] + 1) * s.n_timesteps - s.above[threshold][above[-1]]
+
+
+    def converged(s, trial_num, stop_error=None, stop_steps=1, stop_delta=None):
+        """
+            Convergence of training at the end of a trial: the filtered error has stayed below stop_error for the last
+            stop_steps timesteps, or the mean error of the trial has decreased by less than a fraction stop_delta of the previous one.
+        """
+
+        if stop_error is not None and s.below(stop_error, trial_num) >= stop_steps:   return True
+
+        if stop_delta is not None and trial_num > 0:
+            if s.trial_error[trial_num-1] - s.trial_error[trial_num] < stop_delta * s.trial_error[trial_num-1]:    return True
+
+        return False
+
+
+    def trim(s, n_total_trials):
+        """ Drops the trials from n_total_trials on, when training stops early. """
+
+        for key in ['trial_error', 'final_error', 'trial_cost', 'mastery_ratio']:
+            if hasattr(s, key):     setattr(s, key, getattr(s, key)[:n_total_trials])
+        s.above = {threshold: above[:n_total_trials] for threshold, above in s.above.items()}
+
+
+    def arrays(s):
+        """ Per-trial aggregates, by name of the saved array. """
+
+        arrays = dict(trial_error=s.trial_error, final_error=s.final_error, trial_cost=s.trial_cost)
+        if hasattr(s, 'mastery_ratio'):     arrays['mastery_ratio'] = s.mastery_ratio
+        return arrays
+
+
+    def offline(s, results):
+        """ Filtered traces and per-trial aggregates of saved results, for results saved without them. """
+
+        recorded = {key: np.asarray(results[key]) for key in s.keys}
+        filters  = Filters(s.keys, recorded['error'].shape, s.c_e, s.c_z)
+        bar      = {key + '_bar': np.zeros_like(a) for key, a in recorded.items()}
+        for trial_num in range(len(recorded['error'])):
+            for key, a in filters.update(trial_num, {key: a[trial_num] for key, a in recorded.items()}).items():   bar[key][trial_num] = a
+        return dict(bar, **filters.arrays())
+
+
+if __name__ == "__main__":
+
+    # Process arguments
+    parser = argparse.ArgumentParser(description='Converts saved Data.npz results to one file per array')
+    parser.add_argument('folders', type=str, nargs='+', help='Results folders, searched recursively for Data.npz files.')
+    parser.add_argument('--compression', default='none', choices=['none', 'zlib'], help='Lossless compression of the arrays.')
+    parser.add_argument('--trace_dtype', default=None, choices=['float64', 'float32', 'float16'], help='Precision of the saved traces.')
+    args = parser.parse_args()
+
+    exp = {'results_format': 'npy', 'results_compression': args.compression, 'results_trace_dtype': args.trace_dtype}
+    for folder in args.folders:
+        for root, dirs, files in os.walk(folder):
+            if 'Data.npz' in files:
+                path = os.path.join(root, 'Data')
+                results = load_results(path)
+                write_results(path, {key: np.ascontiguousarray(results.read(key)) for key in results.keys()}, exp)
+                print('Converted', path)
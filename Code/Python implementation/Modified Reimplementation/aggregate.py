@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+    This script belongs to a modified reimplementation of the models described in -
+    Pyle, R. and Rosenbaum, R., 2019.
+    A reservoir computing model of reward-modulated motor learning and automaticity.
+    Neural computation, 31(7), pp.1430-1461.
+
+    This script aggregates the results of the seeds of a task variant, for the figures comparing the variants.
+    The error and cost, low pass filtered with tau_e as in the figures of the models (as saved, or filtered here for results
+    saved without them), and the norms of the weight matrices are computed for each seed by streaming over its results a few trials at a time, with the seeds in parallel processes,
+    and kept every few ms only. Their mean, median and percentiles across the seeds are saved in <results_folder>/Aggregate.npz.
+    Seeds whose training stopped early are aligned on the start of testing, without values for their missing training trials.
+    Memory is bounded by the chunk of trials for results saved with "results_format": "npy"; arrays of a Data.npz file are read whole, one at a time.
+    To run: python3 aggregate.py --parameters="<path_to_parameter_file.json>" <results_folder> [<results_folder> ...] [--plot]
+
+"""
+
+import argparse, json, os
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from scipy import signal
+import matplotlib.pyplot as plt
+from Recording import load_results
+
+
+curves = ['error', 'cost', 'W_RMHL', 'W_FORCE']                                            # Curves aggregated, when saved by the model
+
+
+def decay(dT, tau, integrator='euler'):
+    """ Fraction of the input taken up by a low pass filter of time constant tau over a timestep, as in the models. """
+
+    if integrator == 'exponential':     return float(1 - np.exp(-dT / tau))
+    return dT / tau
+
+
+def stream(path, key, chunk):
+    """ Yields the trials of an array of results, chunk trials at a time. """
+
+    results = load_results(path)
+    if results.npz is not None:
+        yield results[key]
+        return
+    for i in range(0, results.n_trials(key), chunk):
+        yield load_results(path, slice(i, i + chunk))[key]
+
+
+def seed_curves(path, c, step, chunk):
+    """
+        Curves of one seed, kept every step timesteps, no. of timesteps per trial and no. of training trials (None if not saved).
+        The error and cost are low pass filtered with rate c; the zero norms of the weights (not computed at that timestep)
+        are replaced by the previous norm.
+    """
+
+    results = load_results(path)
+    out = {}
+    n_timesteps = None
+    for key in curves:
+        filtered = key + '_bar' in results
+        if not filtered and key not in results:    continue
+        start, last, kept = 0, None, []
+        for a in stream(path, key + '_bar' if filtered else key, chunk):
+            n_timesteps = a.shape[1]
+            a = a.ravel().astype(float)
+            if key in ['error', 'cost'] and not filtered:
+                if last is None:    last = a[0]
+                a, _ = signal.lfilter([c], [1, c - 1], a, zi=[(1 - c) * last])
+                last = a[-1]
+            elif key not in ['error', 'cost']:
+                if last is None:    last = a[0]
+                idx = np.maximum.accumulate(np.where(a != 0, np.arange(1, len(a) + 1), 0))
+                a = np.concatenate(([last], a))[idx]
+                last = a[-1]
+            kept.append(a[(-start) % step::step])
+            start += len(a)
+        out[key] = np.concatenate(kept)
+    n_train_trials = int(np.sum(results['training'])) if 'training' in results else None
+    return out, n_timesteps, n_train_trials
+
+
+def aggregate(folder, parameters, step=50, chunk=1, percentiles=(5, 25, 75, 95), workers=None):
+    """ Aggregates the curves of the seeds in folder, and saves them in folder/Aggregate.npz. """
+
+    dT   = parameters['dT']
+    c    = decay(dT, parameters['tau_e'], parameters.get('integrator', 'euler'))
+    runs = sorted(d for d in os.listdir(folder) if '_nsegs' in d and
+                  (os.path.exists(os.path.join(folder, d, 'Data.npz')) or os.path.isdir(os.path.join(folder, d, 'Data'))))
+    assert runs, 'No results found in ' + folder
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        seeds = list(pool.map(seed_curves, [os.path.join(folder, d, 'Data') for d in runs],
+                              [c] * len(runs), [step] * len(runs), [chunk] * len(runs)))
+
+    n_timesteps    = seeds[0][1]
+    n_train_trials = np.array([parameters['n_train_trials'] if n is None else n for _, _, n in seeds])
+    n_points       = -(-n_train_trials * n_timesteps // step)                               # No. of points of the training trials of each seed
+    arrays = {'seeds': np.array([int(d.split('_')[0]) for d in runs]), 'percentiles': np.array(percentiles),
+              'n_train_trials': n_train_trials,
+              't_test': n_points.max() * step * dT}                                         # Time (ms) of the start of testing
+    for key in seeds[0][0]:
+        a = np.array([np.concatenate((curves_[key][:k], np.full(n_points.max() - k, np.nan), curves_[key][k:]))
+                      for (curves_, _, _), k in zip(seeds, n_points)])                      # (n_seeds, n_points)
+        arrays[key + '_mean']        = np.nanmean(a, axis=0)
+        arrays[key + '_median']      = np.nanmedian(a, axis=0)
+        arrays[key + '_percentiles'] = np.nanpercentile(a, percentiles, axis=0)
+    arrays['t'] = np.arange(len(arrays['error_mean'])) * step * dT                          # Time (ms) of each point
+    np.savez(os.path.join(folder, 'Aggregate.npz'), **arrays)
+    return arrays
+
+
+def plot(folder, plot_format='png'):
+    """ Plots the median and percentile bands of each aggregated curve of folder/Aggregate.npz. """
+
+    _ = np.load(os.path.join(folder, 'Aggregate.npz'))
+    names = {'error': 'MSE', 'cost': 'Cost', 'W_RMHL': 'W_norm', 'W_FORCE': 'W_norm'}
+    colors = {'error': 'blue', 'cost': 'purple', 'W_RMHL': 'green', 'W_FORCE': 'purple'}
+
+    figs = {}
+    for key in curves:
+        if key + '_median' not in _:   continue
+        if names[key] not in figs:     figs[names[key]] = plt.subplots(1)
+        fig, ax = figs[names[key]]
+
+        p = _[key + '_percentiles']
+        for i in range(len(p) // 2):
+            ax.fill_between(_['t'], p[i], p[-1 - i], color=colors[key], alpha=0.2, linewidth=0)
+        ax.plot(_['t'], _[key + '_median'], color=colors[key], linewidth=0.5)
+        ax.axvline(x=_['t_test'], color='grey', linewidth=2, alpha=0.5)
+
+        if key in ['error', 'cost']:    ax.set_yscale('log')
+        ax.set_ylabel({'MSE': 'Distance from Target', 'Cost': 'Cost', 'W_norm': '||W||'}[names[key]])
+        ax.spines['top'].set_visible(False)
+        ax.spines['right'].set_visible(False)
+        ax.spines['bottom'].set_visible(False)
+        ax.get_xaxis().set_ticks([])
+
+    for name, (fig, ax) in figs.items():
+        fig.savefig(os.path.join(folder, 'Aggregate_' + name + '.' + plot_format))
+
+
+if __name__ == "__main__":
+
+    # Process arguments
+    parser = argparse.ArgumentParser(description='Aggregates the results of the seeds of task variants of the reimplementation of Rosenbaum 2019')
+    parser.add_argument('folders', type=str, nargs='+', help='Results folders of the task variants, holding one <seed>_nsegs<n> folder per seed.')
+    parser.add_argument('--parameters', default='Descriptions/simulation_parameter_file_Task1_FORCE.json', type=str, help='Path of parameter file of the simulations.')
+    parser.add_argument('--step', default=50, type=int, help='No. of timesteps between two points of the aggregated curves.')
+    parser.add_argument('--chunk', default=1, type=int, help='No. of trials read at a time.')
+    parser.add_argument('--percentiles', default=[5, 25, 75, 95], type=float, nargs='+', help='Percentiles across the seeds, in pairs of bands.')
+    parser.add_argument('--workers', default=None, type=int, help='No. of seeds processed in parallel (default: no. of CPUs).')
+    parser.add_argument('--plot', action='store_true', help='Plots the aggregated curves in each results folder.')
+    args = parser.parse_args()
+
+    parameters = json.load(open(args.parameters))
+    for folder in args.folders:
+        aggregate(folder, parameters, args.step, args.chunk, args.percentiles, args.workers)
+        if args.plot:   plot(folder)
+        print('Aggregated', folder)
@@ -0,0 +1,173 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+    This script belongs to a modified reimplementation of the models described in -
+    Pyle, R. and Rosenbaum, R., 2019.
+    A reservoir computing model of reward-modulated motor learning and automaticity.
+    Neural computation, 31(7), pp.1430-1461.
+
+    This script benchmarks the throughput of the models over a grid of algorithms, task types, N and n_segs.
+    Each configuration is simulated for 5 training trials and 1 testing trial of a short timespan, with the parameter file
+    of its algorithm and task (Descriptions/simulation_parameter_file_Task<task_type>_<FORCE, RMHL or ST>.json), and the
+    arm of n_segs segments of Descriptions_scaled. Its profile (see Profile.py) gives:
+        train_steps_per_s   : no. of training timesteps per s
+        test_steps_per_s    : no. of testing timesteps per s
+        build_s             : time (s) to build the model
+        rls_update_ms       : time (ms) of an RLS update (FORCE and SUPERTREX)
+        norm_us             : time (us) of Task.norm of the readout weights, per timestep
+        postprocess_s       : time (s) of the low pass filters and of saving the results
+    The configurations run one at a time, in a temporary folder, and the best of --repeat runs is kept. Each benchmark is
+    appended to a history file, and compared to a baseline, which flags the configurations whose training or testing
+    throughput dropped by more than --tolerance (then exits with status 1). --save_baseline makes the benchmark the baseline.
+    To run: python3 benchmark.py [--algorithms FORCE RMHL SUPERTREX] [--task_types 1 2 3] [--N 500 1000 2000 5000] [--n_segs 2 10 50]
+                                 [--set='{"sparse_J": true}'] [--save_baseline]
+
+"""
+
+import argparse, contextlib, datetime, io, itertools, json, os, platform, shutil, subprocess, sys, tempfile
+import numpy as np
+from Experiment import Experiment
+
+
+metrics = ['train_steps_per_s', 'test_steps_per_s', 'build_s', 'rls_update_ms', 'norm_us', 'postprocess_s']
+checked = ['train_steps_per_s', 'test_steps_per_s']                                         # Metrics whose drop is a regression
+
+
+def arm(n_segs, task_type):
+    """ Lengths and costs of an arm of n_segs segments, as in the descriptor files. """
+
+    if n_segs == 2:     arm_len = [1.8, 1.8]
+    else:               arm_len = ([1.8, 1.2, 0.6] + [0.1] * n_segs)[:n_segs]
+    if task_type == 3:  arm_cost = ([0.1, 0.01] + [0.0] * n_segs)[:n_segs]
+    else:               arm_cost = [0.0] * n_segs
+    return arm_len, arm_cost
+
+
+def configurations(args):
+    """ Configurations (algorithm, task_type, N, n_segs) of the grid which have a parameter file; task #1 has 1 segment. """
+
+    configs = []
+    for algorithm, task_type, N in itertools.product(args.algorithms, args.task_types, args.N):
+        if not os.path.exists(parameter_file(algorithm, task_type)):    continue
+        for n_segs in ([1] if task_type == 1 else args.n_segs):
+            configs.append((algorithm, task_type, N, n_segs))
+    return configs
+
+
+def parameter_file(algorithm, task_type):
+    """ Parameter file of an algorithm on a task. """
+
+    return 'Descriptions/simulation_parameter_file_Task' + str(task_type) + '_' + {'SUPERTREX': 'ST'}.get(algorithm, algorithm) + '.json'
+
+
+def name(config):
+    """ Name of a configuration, by which it is compared to the baseline. """
+
+    algorithm, task_type, N, n_segs = config
+    return algorithm + '_Task' + str(task_type) + '_N' + str(N) + '_nsegs' + str(n_segs)
+
+
+def benchmark(config, args, folder):
+    """ Simulates a configuration in a new subfolder of folder, and returns its metrics, or the reason of its divergence. """
+
+    algorithm, task_type, N, n_segs = config
+    arm_len, arm_cost = arm(n_segs, task_type)
+    parameters = dict(json.load(open(parameter_file(algorithm, task_type))), N=N, n_train_trials=5, n_test_trials=1, **args.set)
+    exp = {'rseed': args.rseed, 'dataset_file': os.path.join(folder, 'butterfly_coords.npz'), 'algorithm': algorithm,
+           'results_folder': tempfile.mkdtemp(dir=folder), 'git-hash': 0, 'timespan': args.timespan,
+           'task_type': task_type, 'n_segs': n_segs, 'arm_len': arm_len, 'arm_cost': arm_cost,
+           'display_plot': 'No', 'plot_format': 'png', 'catalogue_file': os.path.join(folder, 'catalogue.db')}
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        experiment = Experiment(exp, parameters)
+        experiment.run(exp)
+    if experiment.failure is not None:  return {'failure': experiment.failure}
+
+    time, calls = experiment.model.profile.time, experiment.model.profile.calls
+    return {
+        'train_steps_per_s':    calls['train.step'] / time['train'],
+        'test_steps_per_s':     calls['test.step'] / time['test'],
+        'build_s':              time['build'],
+        'rls_update_ms':        1e3 * time['train.rls'] / calls['train.rls'] if calls['train.rls'] else None,
+        'norm_us':              1e6 * time['train.norm'] / calls['train.norm'],
+        'postprocess_s':        time['train.filters'] + time['test.filters'] + time['save_results'],
+        }
+
+
+def best(runs):
+    """ Best value of each metric over repeated runs: the highest throughput, the shortest time. """
+
+    if any('failure' in run for run in runs):   return next(run for run in runs if 'failure' in run)
+    return {key: None if runs[0][key] is None else (max if key.endswith('per_s') else min)(run[key] for run in runs) for key in metrics}
+
+
+def git_hash():
+    """ Commit of the code benchmarked, or None outside of a git repository. """
+
+    try:    return subprocess.run(['git', 'rev-parse', 'HEAD'], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):    return None
+
+
+if __name__ == "__main__":
+
+    # Process arguments
+    parser = argparse.ArgumentParser(description='Benchmarks the models of the reimplementation of Rosenbaum 2019')
+    parser.add_argument('--algorithms', default=['FORCE', 'RMHL', 'SUPERTREX'], type=str, nargs='+', help='Algorithms benchmarked.')
+    parser.add_argument('--task_types', default=[1, 2, 3], type=int, nargs='+', help='Task types benchmarked.')
+    parser.add_argument('--N', default=[500, 1000, 2000, 5000], type=int, nargs='+', help='Reservoir sizes benchmarked (e.g. up to 20000).')
+    parser.add_argument('--n_segs', default=[2, 10, 50], type=int, nargs='+', help='No. of arm segments benchmarked, for tasks #2 and #3.')
+    parser.add_argument('--timespan', default=100, type=int, help='Duration (ms) of a trial.')
+    parser.add_argument('--rseed', default=5489, type=int, help='Seed of the simulations.')
+    parser.add_argument('--repeat', default=1, type=int, help='No. of runs of each configuration, of which the best is kept.')
+    parser.add_argument('--set', default={}, type=json.loads, help='Parameters set for all the configurations, as json, e.g. \'{"sparse_J": true}\'.')
+    parser.add_argument('--history', default='Benchmarks/history.jsonl', type=str, help='File the benchmarks are appended to.')
+    parser.add_argument('--baseline', default='Benchmarks/baseline.json', type=str, help='File of the baseline benchmark.')
+    parser.add_argument('--tolerance', default=0.1, type=float, help='Drop of throughput from the baseline flagged as a regression.')
+    parser.add_argument('--save_baseline', action='store_true', help='Saves the benchmark as the baseline of its configurations.')
+    args = parser.parse_args()
+
+    assert all(a in ['FORCE', 'RMHL', 'SUPERTREX'] for a in args.algorithms),  "algorithms must be FORCE, RMHL or SUPERTREX."
+    assert args.repeat > 0,                                                     "repeat must be greater than zero."
+    baseline = json.load(open(args.baseline)) if os.path.exists(args.baseline) else {}
+    info = {'date': datetime.datetime.now().isoformat(timespec='seconds'), 'git_hash': git_hash(), 'machine': platform.node(),
+            'processor': platform.processor(), 'python': platform.python_version(), 'numpy': np.__version__,
+            'timespan': args.timespan, 'rseed': args.rseed, 'set': args.set}
+
+    # Benchmark the configurations, one at a time
+    folder = tempfile.mkdtemp()
+    results, regressions = {}, []
+    print('%-48s %12s %12s %9s %10s %9s %10s  %s' % ('configuration', 'train st/s', 'test st/s', 'build s', 'rls ms', 'norm us', 'post s', 'vs baseline'))
+    try:
+        for config in configurations(args):
+            _name = name(config)
+            results[_name] = result = best([benchmark(config, args, folder) for _ in range(args.repeat)])
+            if 'failure' in result:
+                print('%-48s diverged: %s' % (_name, result['failure']))
+                continue
+
+            # Compare to the baseline
+            change = ''
+            if _name in baseline:
+                ratios = {key: result[key] / baseline[_name][key] for key in checked}
+                change = '  '.join('%s %+.0f%%' % (key.split('_')[0], 100 * (r - 1)) for key, r in ratios.items())
+                if min(ratios.values()) < 1 - args.tolerance:
+                    regressions.append(_name)
+                    change += '  REGRESSION'
+            print('%-48s %12.1f %12.1f %9.3f %10s %9.1f %10.3f  %s' % (_name, result['train_steps_per_s'], result['test_steps_per_s'],
+                  result['build_s'], '-' if result['rls_update_ms'] is None else '%.3f' % result['rls_update_ms'],
+                  result['norm_us'], result['postprocess_s'], change))
+    finally:
+        shutil.rmtree(folder)
+
+    # Save the benchmark in the history, and as the baseline
+    for file in [args.history, args.baseline]:
+        if os.path.dirname(file) and not os.path.exists(os.path.dirname(file)):     os.makedirs(os.path.dirname(file))
+    with open(args.history, 'a') as f:
+        for _name, result in results.items():     f.write(json.dumps(dict(info, configuration=_name, **result)) + '\n')
+    if args.save_baseline:
+        baseline.update({_name: dict(info, **result) for _name, result in results.items() if 'failure' not in result})
+        with open(args.baseline, 'w') as f:    json.dump(baseline, f, indent=4)
+
+    if regressions:
+        print(len(regressions), 'regressions:', ', '.join(regressions))
+        sys.exit(1)
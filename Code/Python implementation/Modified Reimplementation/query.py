@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+    This script belongs to a modified reimplementation of the models described in -
+    Pyle, R. and Rosenbaum, R., 2019.
+    A reservoir computing model of reward-modulated motor learning and automaticity.
+    Neural computation, 31(7), pp.1430-1461.
+
+    This script queries the catalogue of completed simulations (see Catalogue.py).
+    By default, it summarises the runs of each variant (algorithm, task, no. of segments, arm cost).
+    To run: python3 query.py [--where "task_type = 2 AND algorithm = 'SUPERTREX'"] [--runs]
+            python3 query.py --sql "SELECT rseed, test_error FROM runs WHERE n_segs = 3 ORDER BY test_error"
+
+"""
+
+import argparse
+import Catalogue
+
+
+summary = """
+    SELECT algorithm, task_type, n_segs, arm_cost, COUNT(*) AS runs,
+           AVG(train_error) AS train_error, AVG(test_error) AS test_error,
+           MIN(test_error) AS min_test_error, MAX(test_error) AS max_test_error,
+           AVG(mastery_time) AS mastery_time, COUNT(mastery_time) AS mastered, COUNT(failure) AS diverged, AVG(wall_time) AS wall_time
+    FROM runs WHERE {} GROUP BY algorithm, task_type, n_segs, arm_cost ORDER BY task_type, n_segs, algorithm, arm_cost
+"""
+
+runs = """
+    SELECT id, date, algorithm, task_type, n_segs, arm_cost, rseed, n_train_trials, train_error, test_error, mastery_time, wall_time, failure, results_path
+    FROM runs WHERE {} ORDER BY id
+"""
+
+
+def show(cursor):
+    """ Prints the rows of a query as a table. """
+
+    header = [c[0] for c in cursor.description]
+    rows   = [['-' if v is None else '%.4g' % v if isinstance(v, float) else str(v) for v in row] for row in cursor]
+    widths = [max([len(h)] + [len(row[i]) for row in rows]) for i, h in enumerate(header)]
+    for row in [header] + rows:
+        print('  '.join(v.rjust(w) for v, w in zip(row, widths)))
+
+
+if __name__ == "__main__":
+
+    # Process arguments
+    parser = argparse.ArgumentParser(description='Queries the catalogue of simulations of the reimplementation of Rosenbaum 2019')
+    parser.add_argument('--catalogue', default='catalogue.db', type=str, help='Path of catalogue file.')
+    parser.add_argument('--where', default='1', type=str, help='SQL condition on the runs, e.g. "task_type = 2 AND n_segs = 3".')
+    parser.add_argument('--runs', action='store_true', help='Lists the runs instead of summarising each variant.')
+    parser.add_argument('--sql', default=None, type=str, help='SQL query on the table runs, overriding the other options.')
+    args = parser.parse_args()
+
+    query = args.sql or (runs if args.runs else summary).format(args.where)
+
+    db = Catalogue.connect(args.catalogue)
+    show(db.execute(query))
+    db.close()
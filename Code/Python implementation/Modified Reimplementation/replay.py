@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+    This script belongs to a modified reimplementation of the models described in -
+    Pyle, R. and Rosenbaum, R., 2019.
+    A reservoir computing model of reward-modulated motor learning and automaticity.
+    Neural computation, 31(7), pp.1430-1461.
+
+    This script regenerates the traces of a range of trials of a simulation saved with checkpoints (see Checkpoint.py).
+    The model is built again from the task descriptor and parameter files, restored from the last checkpoint at or before
+    the first trial, and simulated up to the last trial, each trial in the phase (training or testing) it had in the
+    simulation, as saved in its results; early stopping is thus not checked again. The traces of the trials, raw and
+    low pass filtered, are those the simulation recorded, and are saved in Replay_<first>_<last>.npz next to its results
+    (or in --output), with the no. of each trial, as trials. A trial aborted by the divergence watchdog ends the replay.
+    To run: python3 replay.py --parameters="<path_to_parameter_file.json>" --experiment="<path_to_experiment_file.json>"
+                              --trials <first> <last> [--rseed=<seed>] [--output=<path.npz>]
+
+"""
+
+import argparse, contextlib, io, json, shutil, tempfile
+import numpy as np
+import Checkpoint
+from ModelFORCE import ModelFORCE
+from ModelRMHL import ModelRMHL
+from ModelSUPERTREX import ModelSUPERTREX
+from Recording import load_results
+from Task import Task
+from Watchdog import Divergence
+from run import verify
+
+
+models = {'FORCE': ModelFORCE, 'RMHL': ModelRMHL, 'SUPERTREX': ModelSUPERTREX}
+
+
+class Collector:
+    """ Recorder of a replayed model (see Recording.Recorder), keeping the traces of the requested trials only. """
+
+    def __init__(s, trials):                                                                # self -> s
+        s.trials  = trials
+        s.records = {}
+
+
+    def write(s, trial_num, trial):
+        if trial_num in s.trials:   s.records[trial_num] = {key: np.copy(a) for key, a in trial.items()}
+
+
+    def trim(s, n_total_trials):    pass
+
+    def save(s, arrays):            pass
+
+
+def replay(exp, parameters, first, last):
+    """
+        Regenerates trials first to last of a simulation, and returns their traces, as arrays (n_trials, n_timesteps[, n_out])
+        by name of the saved array (the trial aborted by a divergence only has the raw traces, as saved), the checkpoint
+        replayed from and the reason of the divergence, or None.
+    """
+
+    results_path = exp['results_folder'] + '/' + str(exp['rseed']) + '_nsegs' + str(exp['n_segs']) + '/'
+    training     = np.asarray(load_results(results_path + 'Data')['training'])
+    assert 0 <= first <= last < len(training),  "trials must be within the " + str(len(training)) + " trials of the simulation."
+    checkpoints  = [trial for trial in Checkpoint.trials(results_path + 'Checkpoints') if trial <= first]
+    assert checkpoints,                         "no checkpoint at or before trial " + str(first) + " in " + results_path + "Checkpoints."
+    start = checkpoints[-1]
+
+    # Same phases as the simulation, without early stopping; nothing is saved but the requested traces
+    n_train_trials = int(np.sum(training))
+    parameters = {key: value for key, value in parameters.items() if key not in ['stop_error', 'stop_delta', 'hooks']}
+    parameters = dict(parameters, n_train_trials=n_train_trials, n_test_trials=len(training) - n_train_trials)
+    folder     = tempfile.mkdtemp()
+    exp        = dict(exp, results_folder=folder, results_checkpoints=0, results_window=1, results_decimate=0,
+                      results_weights=0)
+
+    failure = None
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            task  = Task(exp, parameters)
+            model = models[exp['algorithm']](parameters, task, exp)
+            model.recorder = Collector(range(first, last+1))
+            Checkpoint.load(model, results_path + 'Checkpoints', start)
+            try:
+                for _ in model.stream(task, 'train', trials=range(start, min(last+1, n_train_trials))):     pass
+                for _ in model.stream(task, 'test', trials=range(max(start, n_train_trials), last+1)):      pass
+            except Divergence as e:
+                failure = str(e)
+                model.recorder.write(model.trial, model.trace)
+    finally:
+        shutil.rmtree(folder)
+
+    records = model.recorder.records
+    keys    = list(records[min(records)]) if records else []
+    traces  = {}
+    for key in keys:
+        shape, dtype = records[min(records)][key].shape, records[min(records)][key].dtype
+        traces[key] = np.stack([records[trial].get(key, np.zeros(shape, dtype=dtype)) for trial in sorted(records)])
+    traces['trials'] = np.array(sorted(records), dtype=int)
+    return traces, start, failure
+
+
+if __name__ == "__main__":
+
+    # Process arguments
+    parser = argparse.ArgumentParser(description='Regenerates trials of a simulation of the reimplementation of Rosenbaum 2019 from its checkpoints')
+    parser.add_argument('--parameters', default='Descriptions/simulation_parameter_file_Task1_FORCE.json', type=str, help='Path of parameter file of the simulation.')
+    parser.add_argument('--experiment', default='Descriptions/task_parameter_file_Task1_FORCE.json', type=str, help='Path of experiment description file of the simulation.')
+    parser.add_argument('--trials', required=True, type=int, nargs=2, help='First and last trials replayed.')
+    parser.add_argument('--rseed', default=None, type=int, help='Seed of the simulation, for a random seed (rseed=0) in the experiment file.')
+    parser.add_argument('--output', default=None, type=str, help='Path of the replayed traces (default: Replay_<first>_<last>.npz next to the results).')
+    args = parser.parse_args()
+
+    exp        = json.load(open(args.experiment))
+    parameters = json.load(open(args.parameters))
+    if args.rseed is not None:  exp['rseed'] = args.rseed
+    verify([exp], [parameters])
+    assert exp['rseed'] != 0,                   "the seed of a simulation with a random seed must be given by --rseed."
+
+    first, last = args.trials
+    traces, start, failure = replay(exp, parameters, first, last)
+    output = args.output or exp['results_folder'] + '/' + str(exp['rseed']) + '_nsegs' + str(exp['n_segs']) + '/Replay_' + str(first) + '_' + str(last) + '.npz'
+    np.savez(output, **traces)
+    print('Replayed trials', first, 'to', last, 'from the checkpoint of trial', start, 'in', output)
+    if failure is not None:     print('Aborted:', failure)
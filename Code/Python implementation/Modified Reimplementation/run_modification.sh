@@ -16,21 +16,21 @@ for i in {1..10}
 do
 
     # Simulations of each algorithm on Task 1
-    python3 run.py --parameters="Descriptions/simulation_parameter_file_Task1_FORCE.json" --experiment="Descriptions/task_parameter_file_Task1_FORCE.json"
-    python3 run.py --parameters="Descriptions/simulation_parameter_file_Task1_RMHL.json" --experiment="Descriptions/task_parameter_file_Task1_RMHL.json"
-        python3 run.py --parameters="Descriptions/simulation_parameter_file_Task1_ST.json" --experiment="Descriptions/task_parameter_file_Task1_ST.json"
+    python3 run.py --parameters="Descriptions/simulation_parameter_file_Task1_FORCE.json" --experiment="Descriptions/task_parameter_file_Task1_FORCE.json" --repeat=$i
+    python3 run.py --parameters="Descriptions/simulation_parameter_file_Task1_RMHL.json" --experiment="Descriptions/task_parameter_file_Task1_RMHL.json" --repeat=$i
+        python3 run.py --parameters="Descriptions/simulation_parameter_file_Task1_ST.json" --experiment="Descriptions/task_parameter_file_Task1_ST.json" --repeat=$i
 
     # Simulations of each algorithm on Task 2
-    python3 run.py --parameters="Descriptions/simulation_parameter_file_Task2_RMHL.json" --experiment="Descriptions/task_parameter_file_Task2_RMHL_Seg2.json"
-    python3 run.py --parameters="Descriptions/simulation_parameter_file_Task2_RMHL.json" --experiment="Descriptions/task_parameter_file_Task2_RMHL_Seg3_Var.json"
-    python3 run.py --parameters="Descriptions/simulation_parameter_file_Task2_ST.json" --experiment="Descriptions/task_parameter_file_Task2_ST_Seg2.json"
-    python3 run.py --parameters="Descriptions/simulation_parameter_file_Task2_ST.json" --experiment="Descriptions/task_parameter_file_Task2_ST_Seg3_Var.json"
+    python3 run.py --parameters="Descriptions/simulation_parameter_file_Task2_RMHL.json" --experiment="Descriptions/task_parameter_file_Task2_RMHL_Seg2.json" --repeat=$i
+    python3 run.py --parameters="Descriptions/simulation_parameter_file_Task2_RMHL.json" --experiment="Descriptions/task_parameter_file_Task2_RMHL_Seg3_Var.json" --repeat=$i
+    python3 run.py --parameters="Descriptions/simulation_parameter_file_Task2_ST.json" --experiment="Descriptions/task_parameter_file_Task2_ST_Seg2.json" --repeat=$i
+    python3 run.py --parameters="Descriptions/simulation_parameter_file_Task2_ST.json" --experiment="Descriptions/task_parameter_file_Task2_ST_Seg3_Var.json" --repeat=$i
 
     # Simulations of each algorithm on Task 3
-    python3 run.py --parameters="Descriptions/simulation_parameter_file_Task3_RMHL.json" --experiment="Descriptions/task_parameter_file_Task3_RMHL_05.json"
-    python3 run.py --parameters="Descriptions/simulation_parameter_file_Task3_RMHL.json" --experiment="Descriptions/task_parameter_file_Task3_RMHL.json"
-    python3 run.py --parameters="Descriptions/simulation_parameter_file_Task3_ST.json" --experiment="Descriptions/task_parameter_file_Task3_ST_05.json"
-    python3 run.py --parameters="Descriptions/simulation_parameter_file_Task3_ST.json" --experiment="Descriptions/task_parameter_file_Task3_ST.json"
+    python3 run.py --parameters="Descriptions/simulation_parameter_file_Task3_RMHL.json" --experiment="Descriptions/task_parameter_file_Task3_RMHL_05.json" --repeat=$i
+    python3 run.py --parameters="Descriptions/simulation_parameter_file_Task3_RMHL.json" --experiment="Descriptions/task_parameter_file_Task3_RMHL.json" --repeat=$i
+    python3 run.py --parameters="Descriptions/simulation_parameter_file_Task3_ST.json" --experiment="Descriptions/task_parameter_file_Task3_ST_05.json" --repeat=$i
+    python3 run.py --parameters="Descriptions/simulation_parameter_file_Task3_ST.json" --experiment="Descriptions/task_parameter_file_Task3_ST.json" --repeat=$i
 
 done
 
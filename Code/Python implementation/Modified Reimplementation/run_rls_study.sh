@@ -0,0 +1,24 @@
+#!/bin/bash
+
+####-------------------------------------------------------------------------####
+
+### Compares the exact P matrix of FORCE and SUPERTREX with its low-rank estimate, for several ranks, on each task
+
+### This script requires the json descriptors for the task and simulation parameteres to be provided in the Descriptions folder.
+
+### To run: bash run_rls_study.sh
+
+####-------------------------------------------------------------------------####
+
+
+VARIANTS=('{"rls": "exact"}' '{"rls": "lowrank", "rls_rank": 50}' '{"rls": "lowrank", "rls_rank": 100}' '{"rls": "lowrank", "rls_rank": 200}')
+
+# Task 1
+python3 study.py --parameters="Descriptions/simulation_parameter_file_Task1_FORCE.json" --experiment="Descriptions/task_parameter_file_Task1_FORCE.json" --variants "${VARIANTS[@]}"
+python3 study.py --parameters="Descriptions/simulation_parameter_file_Task1_ST.json" --experiment="Descriptions/task_parameter_file_Task1_ST.json" --variants "${VARIANTS[@]}"
+
+# Task 2
+python3 study.py --parameters="Descriptions/simulation_parameter_file_Task2_ST.json" --experiment="Descriptions/task_parameter_file_Task2_ST_Seg2.json" --variants "${VARIANTS[@]}"
+
+# Task 3
+python3 study.py --parameters="Descriptions/simulation_parameter_file_Task3_ST.json" --experiment="Descriptions/task_parameter_file_Task3_ST.json" --variants "${VARIANTS[@]}"
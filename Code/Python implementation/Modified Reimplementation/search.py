@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+    This script belongs to a modified reimplementation of the models described in -
+    Pyle, R. and Rosenbaum, R., 2019.
+    A reservoir computing model of reward-modulated motor learning and automaticity.
+    Neural computation, 31(7), pp.1430-1461.
+
+    This script searches the task and simulation parameters by successive halving: many candidates are simulated
+    on a small budget (few training trials, or a short timespan), and the best 1/eta of them are promoted to a budget
+    eta times larger, round after round, up to the full budget. The search file holds:
+        experiment  : path of the task descriptor file
+        parameters  : path of the parameter file
+        space       : swept dimensions of the candidates, as the sweep of a sweep file (see sweep.py)
+        candidates  : no. of candidates, drawn at random among the points of the space (optional, default all the points)
+        budget      : key of the budget, "parameters.n_train_trials" or "experiment.timespan"
+        min_budget  : budget of the first round
+        max_budget  : budget of the last round, at most that of the descriptor files (optional, default that of the files)
+        eta         : reduction factor between two rounds (optional, default 3)
+        seeds       : seeds simulated for each candidate (optional, default the rseed of the task descriptor file)
+    e.g. Descriptions_scaled/search_file_Task2_ST_Seg3.json. The score of a candidate is its error while testing, low pass filtered
+    with tau_e, averaged over the testing trials and the seeds; a diverged simulation scores inf.
+    Each evaluation is simulated in <results_folder>/<search file name>/<round>_<candidate> (as by sweep.py, in parallel processes)
+    and recorded in the catalogue; all of them are listed with their round, budget and score in
+    <results_folder>/<search file name>/search.json. As completed runs are reused, an interrupted search can be run again.
+    To run: python3 search.py <path_to_search_file.json> [--workers=<n>] [--dry_run]
+
+"""
+
+import argparse, json, math, os, sys
+import numpy as np
+from Recording import load_results
+from run import verify
+from sweep import expand, schedule
+
+
+def budgets(max_budget, min_budget, eta):
+    """ Budget of each round, from about min_budget up to max_budget, eta times larger each round. """
+
+    n_rounds = 1 + int(math.log(max_budget / min_budget, eta) + 1e-9)
+    return [int(round(max_budget / eta ** (n_rounds - 1 - r))) for r in range(n_rounds)]
+
+
+def score(results_path, failure):
+    """ Mean filtered test error of a simulation, inf if it diverged. """
+
+    if failure is not None:     return np.inf
+    results = load_results(results_path + 'Data')
+    _score  = float(np.mean(results['error_bar'][~results['training']]))
+    return _score if np.isfinite(_score) else np.inf
+
+
+if __name__ == "__main__":
+
+    # Process arguments
+    parser = argparse.ArgumentParser(description='Searches the parameters of the reimplementation of Rosenbaum 2019 by successive halving')
+    parser.add_argument('search', type=str, help='Path of search file.')
+    parser.add_argument('--workers', default=None, type=int, help='No. of processes simulating the candidates (default: no. of CPUs).')
+    parser.add_argument('--dry_run', action='store_true', help='Lists the candidates and rounds without simulating them.')
+    args = parser.parse_args()
+
+    search = json.load(open(args.search))
+    name   = os.path.splitext(os.path.basename(args.search))[0]
+    eta    = search.get('eta', 3)
+    section, key = search['budget'].split('.', 1)
+    assert search['budget'] in ['parameters.n_train_trials', 'experiment.timespan'],   "budget must be parameters.n_train_trials or experiment.timespan."
+    assert eta > 1,                                                                     "eta must be > 1."
+
+    # Candidates, drawn at random (reproducibly) among the points of the space
+    candidates = expand(dict(search, sweep=search['space']))
+    n_candidates = search.get('candidates', len(candidates))
+    if n_candidates < len(candidates):
+        candidates = [candidates[i] for i in sorted(np.random.RandomState(0).choice(len(candidates), n_candidates, replace=False))]
+
+    # Budgets of the rounds, the largest being that of the descriptor files by default
+    exp        = candidates[0][1]
+    full       = exp[key] if section == 'experiment' else candidates[0][2][key]            # Budget of a full run
+    max_budget = search.get('max_budget', full)
+    assert 0 < search['min_budget'] <= max_budget,                                      "min_budget must be > 0 and <= max_budget."
+    assert max_budget <= full,                                                          "max_budget must be <= the " + key + " of the descriptor files (" + str(full) + ")."
+    _budgets   = budgets(max_budget, search['min_budget'], eta)
+
+    # Resolve the random seed (rseed=0) once, for all the candidates
+    seeds = search.get('seeds', [exp['rseed']])
+    seeds = [np.random.randint(0,1e7) if seed == 0 else seed for seed in seeds]
+    base  = os.path.join(exp['results_folder'], name)
+
+    print(len(candidates), 'candidates,', len(seeds), 'seeds, budgets', _budgets)
+    for i, (swept, _, _) in enumerate(candidates):
+        print('%4d  %s' % (i, json.dumps(swept)))
+    if args.dry_run:    sys.exit()
+
+    # Successive halving
+    evaluations = []
+    survivors   = list(range(len(candidates)))
+    for r, budget in enumerate(_budgets):
+        print('Round', r, ':', len(survivors), 'candidates, budget', budget)
+
+        # Points of the round, one per surviving candidate and seed
+        points, owners = [], []
+        for i in survivors:
+            swept, _exp, _params = candidates[i]
+            for seed in seeds:
+                _exp_    = dict(_exp, rseed=seed, results_folder=os.path.join(base, str(r) + '_' + str(i)))
+                _params_ = dict(_params)
+                (_exp_ if section == 'experiment' else _params_)[key] = budget
+                verify([_exp_], [_params_])
+                points.append((_exp_, _params_))
+                owners.append(i)
+
+        # Evaluate the points, and score each candidate by its mean over the seeds
+        outcomes = schedule(points, args.workers)
+        scores = {i: [] for i in survivors}
+        for i, (_exp_, _), (results_path, failure) in zip(owners, points, outcomes):
+            scores[i].append(score(results_path, failure))
+            evaluations.append({'round': r, 'budget': budget, 'candidate': i, 'swept': candidates[i][0], 'rseed': _exp_['rseed'],
+                                'results_path': results_path, 'failure': failure, 'score': scores[i][-1]})
+        scores = {i: float(np.mean(s)) for i, s in scores.items()}
+
+        with open(os.path.join(base, 'search.json'), 'w') as f:
+            json.dump({'budgets': _budgets, 'seeds': seeds, 'evaluations': evaluations}, f, indent=4)
+
+        # Promote the best 1/eta of the candidates (ties kept in order)
+        ranking = sorted(survivors, key=lambda i: scores[i])
+        for i in ranking:
+            print('%4d  %10.4g  %s' % (i, scores[i], json.dumps(candidates[i][0])))
+        if r < len(_budgets) - 1:   survivors = ranking[:max(1, len(survivors) // eta)]
+
+    best = ranking[0]
+    print('Best candidate', best, ':', json.dumps(candidates[best][0]), 'scores %.4g' % scores[best])
+    with open(os.path.join(base, 'search.json'), 'w') as f:
+        json.dump({'budgets': _budgets, 'seeds': seeds, 'evaluations': evaluations,
+                   'best': {'candidate': best, 'swept': candidates[best][0], 'score': scores[best]}}, f, indent=4)
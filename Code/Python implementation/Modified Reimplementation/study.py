@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+    This script belongs to a modified reimplementation of the models described in -
+    Pyle, R. and Rosenbaum, R., 2019.
+    A reservoir computing model of reward-modulated motor learning and automaticity.
+    Neural computation, 31(7), pp.1430-1461.
+
+    This script simulates one task with variants of the simulation parameters, on the same seed(s),
+    and reports the accuracy, speed and memory footprint of each variant.
+    To run: python3 study.py --parameters="<path_to_parameter_file.json>" --experiment="<path_to_experiment_file.json>"
+                             --variants '{"rls": "exact"}' '{"rls": "lowrank", "rls_rank": 100}' [--seeds 5489 587136 ...]
+    The results of each variant are stored in <results_folder>/study_<no. of variant>.
+
+"""
+
+import argparse, json, time
+import numpy as np
+from Experiment import Experiment
+
+
+def state_bytes(model):
+    """ Memory used by the arrays of the model (and of its attributes, e.g. a sparse or low-rank matrix). """
+
+    n = 0
+    for v in vars(model).values():
+        for a in [v] + (list(vars(v).values()) if hasattr(v, '__dict__') else []):
+            arrays = a.values() if isinstance(a, dict) else [a]                             # e.g. the traces of a trial, or of a Recorder
+            n += sum(b.nbytes for b in arrays if isinstance(b, np.ndarray) and not isinstance(b, np.memmap))
+    return n
+
+
+if __name__ == "__main__":
+
+    # Process arguments
+    parser = argparse.ArgumentParser(description='Parameter study of the reimplementation of Rosenbaum 2019')
+    parser.add_argument('--parameters', default='Descriptions/simulation_parameter_file_Task1_FORCE.json', type=str, help='Path of parameter file.')
+    parser.add_argument('--experiment', default='Descriptions/task_parameter_file_Task1_FORCE.json', type=str, help='Path of experiment description file.')
+    parser.add_argument('--variants', default=['{}'], type=str, nargs='+', help='Parameter values overriding the parameter file, as json, one per variant.')
+    parser.add_argument('--seeds', default=None, type=int, nargs='+', help='Seeds to simulate each variant on (default: rseed of the experiment file).')
+
+    args       = parser.parse_args()
+    exp        = json.load(open(args.experiment))
+    parameters = json.load(open(args.parameters))
+    variants   = [json.loads(v) for v in args.variants]
+
+    # Resolve the seeds once, for all the variants
+    seeds = args.seeds or [exp['rseed']]
+    seeds = [rseed if rseed != 0 else np.random.randint(0,1e7) for rseed in seeds]
+
+    # Simulate each variant on each seed
+    results = np.zeros((len(variants), len(seeds), 4))
+    for i, variant in enumerate(variants):
+        for j, rseed in enumerate(seeds):
+            _exp = dict(exp, rseed=rseed, results_folder=exp['results_folder'] + '/study_' + str(i))
+            _params    = dict(parameters, **variant)
+            experiment = Experiment(_exp, _params)
+            _m = experiment.model
+
+            t0 = time.perf_counter()
+            failure = experiment.step(_m.train, experiment.task)
+            t1 = time.perf_counter()
+            failure = failure or experiment.step(_m.test, experiment.task)
+            t2 = time.perf_counter()
+            experiment.record(_m, _exp, _params, t2 - t0, failure)
+
+            error = np.nan if failure else np.mean(_m.filters.trial_error[_m.n_train_trials:])             # Diverged simulations are reported as nan
+            results[i, j] = error, t1 - t0, t2 - t1, state_bytes(_m) / 2**20
+
+    # Report, averaged over the seeds; the difference of test error with the first variant is the largest over the seeds
+    print('\nTask #' + str(exp['task_type']) + ', ' + exp['algorithm'] + ', seeds ' + ' '.join(str(rseed) for rseed in seeds))
+    print('%-40s %12s %12s %10s %10s %12s' % ('variant', 'test error', 'difference', 'train (s)', 'test (s)', 'memory (MB)'))
+    for i, variant in enumerate(variants):
+        error, t_train, t_test, memory = results[i].mean(axis=0)
+        difference = np.max(np.abs(results[i, :, 0] - results[0, :, 0]))
+        print('%-40s %12.4g %12.4g %10.1f %10.1f %12.1f' % (json.dumps(variant), error, difference, t_train, t_test, memory))
@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+    This script belongs to a reimplementation of the models described in -
+    Pyle, R. and Rosenbaum, R., 2019.
+    A reservoir computing model of reward-modulated motor learning and automaticity.
+    Neural computation, 31(7), pp.1430-1461.
+
+    This script saves checkpoints of a simulation at the start of its trials, from which replay.py simulates any range
+    of trials again, deterministically, so that their traces can be regenerated instead of being saved at full resolution.
+    They are taken as given in the experiment file by
+        results_checkpoints : no. of trials between two checkpoints, 0 for none (optional, default 0)
+    in the Checkpoints folder next to the results, as <trial>.npz. A checkpoint holds the dynamic state of the model, as
+    listed by its attribute state (reservoir state, output, readout weights, P matrix, filtered error and output, and the
+    projection of the reservoir activity but for its history), the outputs fed back while testing, the state of the low
+    pass filters of the traces and the state of the random generator; the connectivity is rebuilt from the seed.
+    Checkpoints are taken by the simulations of a single model (see stream), not by those of a Comparison, whose models
+    share their random numbers.
+
+"""
+
+import glob, os
+import numpy as np
+
+
+def save(model, trial_num):
+    """ Saves the state of a model and of the random generator at the start of trial trial_num. """
+
+    arrays = {}
+    for key in model.state + ['z_past']:
+        if not hasattr(model, key):     continue
+        value = getattr(model, key)
+        if value is None:   continue
+        if isinstance(value, np.ndarray) or np.isscalar(value):     arrays[key] = value
+        else:                                                                               # e.g. a low-rank P: its arrays and numbers
+            for attr, a in vars(value).items():
+                if isinstance(a, (np.ndarray, int, float, np.number)):  arrays[key + '.' + attr] = a
+    for key, value in model.filters.last.items():   arrays['filters.' + key] = value
+    _, keys, pos, has_gauss, cached_gaussian = np.random.get_state()
+    arrays.update(rng_keys=keys, rng_pos=pos, rng_has_gauss=has_gauss, rng_cached_gaussian=cached_gaussian)
+
+    folder = model.results_path + 'Checkpoints'
+    if not os.path.exists(folder):  os.makedirs(folder)
+    if trial_num == 0:
+        for file in glob.glob(os.path.join(folder, '*.npz')):   os.remove(file)            # Of a former simulation
+    np.savez(os.path.join(folder, str(trial_num) + '.npz'), **arrays)
+
+
+def trials(folder):
+    """ Trials of the checkpoints saved in folder, in order. """
+
+    return sorted(int(os.path.splitext(os.path.basename(file))[0]) for file in glob.glob(os.path.join(folder, '*.npz')))
+
+
+def load(model, folder, trial_num):
+    """ Restores the state of a model and of the random generator at the start of trial trial_num, from its checkpoint in folder. """
+
+    with np.load(os.path.join(folder, str(trial_num) + '.npz')) as f:
+        arrays = {key: f[key] for key in f.files}
+    for key, a in arrays.items():
+        if key.startswith('rng_'):  continue
+        value = a[()] if a.ndim == 0 else a                                                 # Scalars as saved
+        name, _, attr = key.partition('.')
+        if name == 'filters':   model.filters.last[attr] = value
+        elif attr:              setattr(getattr(model, name), attr, value)
+        else:                   setattr(model, name, value)
+    np.random.set_state(('MT19937', arrays['rng_keys'], int(arrays['rng_pos']), int(arrays['rng_has_gauss']),
+                         float(arrays['rng_cached_gaussian'])))
+    model.trial = trial_num
@@ -0,0 +1,251 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+    This script belongs to a reimplementation of the models described in -
+    Pyle, R. and Rosenbaum, R., 2019.
+    A reservoir computing model of reward-modulated motor learning and automaticity.
+    Neural computation, 31(7), pp.1430-1461.
+
+    This script defines the hooks called during a simulation: at the start and end of each trial, and every few timesteps,
+    with a read-only view of the state of the model. They are given in the parameter file by
+        hooks   : {"<hook>": {<options>}, ...} where <hook> is a built-in hook or <module>.<class> (optional)
+    The built-in hooks are:
+        throughput  : no. of timesteps per s of each trial, and of every "every" timesteps
+        memory      : resident memory of the process at the end of each trial (and every "every" timesteps),
+                      and memory allocated by python if "tracemalloc" is true
+        sampler     : sampling profiler of the trials given by "trials" (default all), sampling the stack of the simulation
+                      every "interval" s (default 0.005); the stacks are written to Samples.txt (collapsed, as for flame graphs)
+    e.g. "hooks": {"throughput": {"every": 1000}, "sampler": {"trials": [2]}}. The results of the hooks are written next to
+    those of the simulation, in Hooks.json. Without hooks, the models simulate the timesteps as is, at no cost.
+
+"""
+
+import collections, functools, importlib, json, os, sys, threading, tracemalloc
+import numpy as np
+from Profile import clock, peak_rss
+
+
+class View:
+    """ Read-only view of the state of a model during a trial, e.g. view.x, view.W_FORCE, view.trace['error'][view.time_step]. """
+
+    def __init__(s, model, phase, trial_num, time_step):                                    # self -> s
+        s._model    = model
+        s.phase     = phase                                                                 # train or test
+        s.trial_num = trial_num
+        s.time_step = time_step
+
+
+    def __getattr__(s, key):
+        a = getattr(s._model, key)
+        if isinstance(a, dict):     return {k: read_only(v) for k, v in a.items()}
+        return read_only(a)
+
+
+def read_only(a):
+    """ Read-only view of an array (other values are returned as is). """
+
+    if isinstance(a, np.ndarray):
+        a = a.view()
+        a.flags.writeable = False
+    return a
+
+
+class Hook:
+    """ Base class of the hooks, called with a View of the model; a hook with every > 0 is also called every `every` timesteps. """
+
+    every = 0
+
+    def trial_start(s, view):   pass
+
+    def trial_end(s, view):     pass
+
+    def step(s, view):          pass
+
+    def results(s):
+        """ Results written in Hooks.json (json-able), or None. """
+        return None
+
+    def close(s, results_path):
+        """ Called once the results of the simulation are saved in results_path. """
+        pass
+
+
+class Throughput(Hook):
+    """ No. of timesteps per s of each trial, and of every `every` timesteps. """
+
+    def __init__(s, every=0):
+        s.every = every
+        s.trials, s.intervals = [], []
+
+
+    def trial_start(s, view):
+        s.t_trial = s.t_step = clock()
+
+
+    def step(s, view):
+        t = clock()
+        s.intervals.append([view.phase, view.trial_num, view.time_step, s.every / (t - s.t_step)])
+        s.t_step = t
+
+
+    def trial_end(s, view):
+        s.trials.append([view.phase, view.trial_num, (view.time_step + 1) / (clock() - s.t_trial)])
+
+
+    def results(s):
+        return {'trials': s.trials, 'intervals': s.intervals}                               # [phase, trial, (timestep,) timesteps per s]
+
+
+def rss():
+    """ Resident memory of the process, in MB (its peak if the current one is not available). """
+
+    try:
+        with open('/proc/self/statm') as f:     return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / 2**20
+    except (OSError, ValueError, AttributeError):
+        return peak_rss()
+
+
+class Memory(Hook):
+    """ Resident memory of the process, and memory allocated by python (tracemalloc), at the end of each trial and every `every` timesteps. """
+
+    def __init__(s, every=0, tracemalloc=False):
+        s.every  = every
+        s.traced = tracemalloc
+        s.started = False                                                                   # Tracing started by this hook, stopped by close
+        s.records = []
+
+
+    def record(s, view):
+        record = [view.phase, view.trial_num, view.time_step, rss(), peak_rss()]
+        if s.traced:    record += [a / 2**20 for a in tracemalloc.get_traced_memory()]
+        s.records.append(record)
+
+
+    def trial_start(s, view):
+        if s.traced and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            s.started = True
+
+
+    def step(s, view):      s.record(view)
+
+    def trial_end(s, view): s.record(view)
+
+
+    def results(s):
+        columns = ['phase', 'trial', 'timestep', 'rss_mb', 'peak_rss_mb'] + (['traced_mb', 'traced_peak_mb'] if s.traced else [])
+        return {'columns': columns, 'records': s.records}
+
+
+    def close(s, results_path):
+        if s.started:   tracemalloc.stop()                                                  # So that the process runs untraced afterwards
+        s.started = False
+
+
+class Sampler(Hook):
+    """
+        Sampling profiler: a thread samples the stack of the simulation every interval s during the given trials (all if None),
+        so that the timings are not distorted as by a deterministic profiler, and counts the samples of each stack.
+    """
+
+    def __init__(s, trials=None, interval=0.005):
+        s.trials   = trials
+        s.interval = interval
+        s.stacks   = collections.Counter()
+        s.thread   = None
+
+
+    def sample(s, ident, stop):
+        while not stop.wait(s.interval):
+            frame = sys._current_frames().get(ident)
+            stack = []
+            while frame is not None:
+                stack.append(os.path.splitext(os.path.basename(frame.f_code.co_filename))[0] + '.' + frame.f_code.co_name)
+                frame = frame.f_back
+            s.stacks[';'.join(reversed(stack))] += 1
+
+
+    def trial_start(s, view):
+        if s.trials is not None and view.trial_num not in s.trials:     return
+        s.stop   = threading.Event()
+        s.thread = threading.Thread(target=s.sample, args=(threading.get_ident(), s.stop), daemon=True)
+        s.thread.start()
+
+
+    def trial_end(s, view):
+        if s.thread is None:    return
+        s.stop.set()
+        s.thread.join()
+        s.thread = None
+
+
+    def results(s):
+        leaves = collections.Counter()
+        for stack, n in s.stacks.items():   leaves[stack.rsplit(';', 1)[-1]] += n
+        total = sum(leaves.values())
+        return {'samples': total, 'top': [[f, n / total] for f, n in leaves.most_common(20)]}  # Fraction of the samples in each function
+
+
+    def close(s, results_path):
+        s.trial_end(None)                                                                   # Sampling thread still running, if any
+        with open(results_path + 'Samples.txt', 'w') as f:
+            for stack, n in s.stacks.most_common():    f.write(stack + ' ' + str(n) + '\n')
+
+
+builtin = {'throughput': Throughput, 'memory': Memory, 'sampler': Sampler}
+
+
+def make(hooks):
+    """ Hooks described in a parameter file, as {name: options}. """
+
+    out = []
+    for name, options in hooks.items():
+        if name in builtin:     Class = builtin[name]
+        else:
+            module, _class = name.rsplit('.', 1)
+            Class = getattr(importlib.import_module(module), _class)
+        out.append(Class(**options))
+    return out
+
+
+def attach(model, hooks):
+    """
+        Replaces the train_step and test_step of a model by ones calling its hooks, and its save_results by one
+        writing the results of the hooks, for this model only.
+    """
+
+    for name, phase in [('train_step', 'train'), ('test_step', 'test')]:
+        setattr(model, name, hooked(getattr(model, name), model, hooks, phase))
+
+    save_results = model.save_results
+    @functools.wraps(save_results)
+    def _save_results(*args, **kwargs):
+        save_results(*args, **kwargs)
+        for hook in hooks:  hook.close(model.results_path)
+        with open(model.results_path + 'Hooks.json', 'w') as f:
+            json.dump({type(hook).__name__: hook.results() for hook in hooks}, f, indent=4)
+    model.save_results = _save_results
+
+
+def hooked(step, model, hooks, phase):
+    """ Timestep of a model calling its hooks; their trial_end is also called when the timestep raises, e.g. a Divergence. """
+
+    stepped = [hook for hook in hooks if hook.every > 0]
+
+    @functools.wraps(step)
+    def _step(task, trial_num, time_step, *args):
+        if time_step == 0:
+            view = View(model, phase, trial_num, time_step)
+            for hook in hooks:  hook.trial_start(view)
+        try:
+            step(task, trial_num, time_step, *args)
+        except BaseException:                                                               # Trial aborted, e.g. by a divergence
+            view = View(model, phase, trial_num, time_step)
+            for hook in hooks:  hook.trial_end(view)
+            raise
+        for hook in stepped:
+            if (time_step+1) % hook.every == 0:     hook.step(View(model, phase, trial_num, time_step))
+        if time_step == model.n_timesteps-1:
+            view = View(model, phase, trial_num, time_step)
+            for hook in hooks:  hook.trial_end(view)
+    return _step
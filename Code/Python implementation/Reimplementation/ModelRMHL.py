@@ -14,13 +14,19 @@
 
 import numpy as np
 import matplotlib.pyplot as plt
-from scipy import stats
+from scipy import stats, sparse
 from tqdm import tqdm
+from Recording import recorder, load_results, Filters, Projection, Snapshots
+from Watchdog import check
+from Catalogue import mastery_threshold
+from Profile import Profile, profiled, clock
+import Hooks
+import Checkpoint
 import os
 
 class ModelRMHL():
 
-    def __init__(s, parameters, task, exp):                                                 # self -> s
+    def __init__(s, parameters, task, exp, reservoir=None):                                 # self -> s
         """
             Initialise the model object.
             
@@ -38,6 +44,16 @@ class ModelRMHL():
                     arm_cost        : cost of moving each arm segment (irrelevant for task #1 and #2)
                     display_plot    : show the plot, too, or just save it
                     plot_format     : file format for saving plot (ps, eps, pdf, pgf, png, raw, rgba, svg, svgz, jpg, jpeg, tif, tiff)
+                    results_format  : npz (single file) or npy (one file per array) format of the saved results (optional)
+                    results_compression : none or zlib compression of the saved results, for npy (optional)
+                    results_trace_dtype : float64, float32 or float16 precision of the saved traces (optional)
+                    results_raw     : Yes or No, save the raw traces besides the low pass filtered ones (optional)
+                    results_window  : no. of last trials saved at full resolution, the others being decimated (optional)
+                    results_decimate : no. of timesteps between the saved timesteps of the decimated trials, 0 for none (optional)
+                    results_checkpoints : no. of trials between two checkpoints of the simulation, 0 for none (optional)
+                    results_projection : random or pca basis of the recorded projection of the reservoir activity (optional)
+                    results_projection_dim : no. of dimensions of the projection (optional, default 10)
+                    results_weights : no. of training timesteps between two snapshots of the readout weights (optional)
                     
             parameters: dict
                 Parameter values where:
@@ -54,9 +70,21 @@ class ModelRMHL():
                     tau_w           : time constant of weight updation
                     tau_e           : low pass filter for MSE
                     tau_z           : low pass filter for z
+                    sparse_J        : store the reservoir connectivity as a sparse matrix (optional)
+                    integrator      : euler or exponential (exact decay of the leak, for larger dT) integration (optional)
+                    dtype           : float64 or float32 precision of the reservoir, readouts and recordings; P stays float64 (optional)
+                    stop_error      : early stopping when the filtered error stays below stop_error for stop_steps timesteps (optional)
+                    stop_steps      : no. of timesteps for stop_error (optional, default 1)
+                    stop_delta      : early stopping when the mean error of a trial decreases by less than a fraction stop_delta (optional)
+                    watchdog_ms     : time (ms) between two checks of divergence, 0 to disable (optional, default 20)
+                    watchdog_bound  : bound on the absolute values of x, z, the readout weights and P (optional, default 1e6)
+                    learningrate    : RMHL learning rate per timestep at dT = 0.2, scaled by dT/0.2 (optional, default 0.0005 as per authors)
             
             task: Task
                 Task object created for this experiment
+
+            reservoir: Model
+                Model object, built on the same seed, whose reservoir is shared (optional)
         """
         
         # Model parameters
@@ -77,12 +105,26 @@ class ModelRMHL():
         s.tau_w             = parameters['tau_w']                                           # Time constant of weight updation
         s.tau_e             = parameters['tau_e']                                           # Low pass filter for displaying MSE
         s.tau_z             = parameters['tau_z']                                           # Low pass filter for displaying z
-
-        s.leak              = s.dT/s.tau                                                    # Reservoir leak
+        s.sparse_J          = parameters.get('sparse_J', False)                             # Sparse storage of reservoir connectivity
+        s.integrator        = parameters.get('integrator', 'euler')                         # Euler or exponential Euler integration
+        s.dtype             = np.dtype(parameters.get('dtype', 'float64'))                  # Precision of reservoir, readouts and recordings
+        s.stop_error        = parameters.get('stop_error', None)                            # Early stopping threshold of the filtered error
+        s.stop_steps        = parameters.get('stop_steps', 1)                               # No. of timesteps below stop_error to stop
+        s.stop_delta        = parameters.get('stop_delta', None)                            # Early stopping relative improvement of the trial error
+        s.watchdog_ms       = parameters.get('watchdog_ms', 20)                             # Time (ms) between two checks of divergence
+        s.watchdog_bound    = parameters.get('watchdog_bound', 1e6)                         # Bound on the absolute values of the state
+        s.hooks             = Hooks.make(parameters.get('hooks', {}))                       # Called during the simulation (see Hooks.py)
+        s.checkpoints       = exp.get('results_checkpoints', 0)                             # No. of trials between two checkpoints (see Checkpoint.py)
+
+        s.leak              = s.decay(s.tau)                                                # Reservoir leak
+        s.watchdog_steps    = max(1, int(round(s.watchdog_ms/s.dT))) if s.watchdog_ms else 0  # No. of timesteps between two checks of divergence
+        s.c_z               = s.decay(s.tau_z)                                              # Low pass filter coefficient for z
+        s.c_bar             = s.decay(1)                                                    # Low pass filter coefficient for error (1 ms)
         s.n_timesteps       = int(s.T/s.dT)                                                 # No. of timesteps in a trial
         s.sigma             = s.lmbda / np.sqrt((s.sparsity*s.N))                           # Standard deviation of initial reservoir connectivity
 
-        s.learningrate      = .0005                                                         # RMHL learning rate as per authors
+        s.learningrate      = parameters.get('learningrate', .0005)                         # RMHL learning rate as per authors
+        s.learningrate     *= s.dT/0.2                                                      # Rate per timestep, tuned for dT = 0.2
 
         if exp['rseed'] == 0:   s.rseed = np.random.randint(0,1e7)
         else :                  s.rseed = exp['rseed']                                      # Seed for randomisation
@@ -93,192 +135,304 @@ class ModelRMHL():
         if not os.path.exists(s.results_path):   os.makedirs(s.results_path)
 
         # Build reservoir architecture
-        s.build(task)
+        s.profile = Profile()                                                               # Wall time, calls and memory of the phases
+        s.build(task, exp, reservoir)
+        if s.hooks:     Hooks.attach(s, s.hooks)                                            # Without hooks, the timesteps are left as is
 
-    def build(s, task):
+    @profiled('build')
+    def build(s, task, exp, reservoir=None):
         """ Building the model architecture. """
 
         _data = task.data
 
+        # Build reservoir, or share the one of a model built on the same seed
+        if reservoir is None:   s.build_reservoir(task)
+        else:
+            s.J, s.Q, s.x = reservoir.J, reservoir.Q, np.copy(reservoir.x)
+            np.random.set_state(reservoir.rng_state)                                        # Same noise as if the reservoir was built here
+        s.J, s.Q, s.x = s.J.astype(s.dtype, copy=False), s.Q.astype(s.dtype, copy=False), s.x.astype(s.dtype, copy=False)
+
+        # Build network
+        s.r = np.tanh(s.x)                                                                  # Resevoir  output activity
+        s.z = np.zeros((s.n_out, 1), dtype=s.dtype)                                         # Reservoir output
+        s.W_RMHL = np.zeros((s.n_out, s.N), dtype=s.dtype)                                  # RMHL readout weights
+
+
+        # Training initialisations
+        s.outputs = np.column_stack((_data['x'], _data['y']))
+        s.outputs = s.outputs.reshape((s.outputs.shape[0], 2, 1)).astype(s.dtype)
+        s.e = 0
+        s.e_bar = 0
+        s.z_RMHL_bar = np.zeros((s.n_out, 1), dtype=s.dtype)
+        s.state = ['x', 'r', 'z', 'e', 'e_bar', 'z_RMHL_bar', 'W_RMHL', 'projection']       # Dynamic state, saved by the checkpoints
+
+
+        # Recording purposes: the timesteps of the current trial, streamed at its end to the filters and the recorder
+        fields = dict(error=(), cost=(), z=(s.n_out,), z_RMHL=(s.n_out,), hz=(2,), W_RMHL=())
+        s.projection = None                                                                 # Projection of the reservoir activity (see Recording.py)
+        if exp.get('results_projection') is not None:
+            s.projection = Projection(exp['results_projection'], s.N, exp.get('results_projection_dim', 10), s.rseed, s.dtype)
+            fields['r_proj'] = (s.projection.k,)
+        s.snapshots = None                                                                  # Snapshots of the readout weights (see Recording.py)
+        if exp.get('results_weights'):
+            s.snapshots = Snapshots(s.results_path + 'Weights', exp['results_weights'], ['W_RMHL'], s.W_RMHL.shape)
+        s.trace = {key: np.zeros((s.n_timesteps,) + shape, dtype=s.dtype) for key, shape in fields.items()}
+        s.trial = 0                                                                         # Trial recorded in the trace
+        s.z_past = np.zeros((5, s.n_timesteps, s.n_out), dtype=s.dtype)                     # Outputs of the last 5 trials, fed back while testing
+        s.filters = Filters(['error', 'cost', 'z', 'z_RMHL', 'hz'], (s.n_total_trials, s.n_timesteps), s.decay(s.tau_e), s.decay(s.tau_z),
+                            thresholds=[s.stop_error, mastery_threshold(s.task_type)])
+        s.recorder = recorder(dict({key: (shape, s.dtype) for key, shape in fields.items()},
+                                   **{key + '_bar': (fields[key], s.dtype) for key in s.filters.keys}),
+                              s.n_total_trials, s.n_timesteps, s.results_path + 'Data', exp)
+
+
+    @profiled('build.reservoir')
+    def build_reservoir(s, task):
+        """ Building the reservoir connectivity, feedback and initial state from the seed. """
+
         # Network initialisations
         np.random.seed(s.rseed)
 
         # Build reservoir
-        s.J = np.zeros((s.N, s.N))
         Jne = task.round_up(s.N * s.N * s.sparsity)
         idx_x, idx_y = task.rand_int(s.N, Jne), task.rand_int(s.N, Jne)
-        s.J[idx_x, idx_y] = 1
-        Jnz, Jcnz = np.nonzero(s.J), np.count_nonzero(s.J)
-        Jr = stats.norm.ppf(np.random.uniform(size=Jcnz))
-        s.J[Jnz] = Jr[:Jcnz]
-        s.J = s.J * s.sigma                                                                 # Reservoir connectivity strengths
+        if s.sparse_J:
+            Jnz = np.unique(idx_x * s.N + idx_y)                                            # Non-zeros in the same (row-major) order as np.nonzero
+            Jr = stats.norm.ppf(np.random.uniform(size=Jnz.size))
+            s.J = sparse.csr_matrix((Jr * s.sigma, (Jnz // s.N, Jnz % s.N)), shape=(s.N, s.N))  # Reservoir connectivity strengths
+        else:
+            s.J = np.zeros((s.N, s.N))
+            s.J[idx_x, idx_y] = 1
+            Jnz, Jcnz = np.nonzero(s.J), np.count_nonzero(s.J)
+            Jr = stats.norm.ppf(np.random.uniform(size=Jcnz))
+            s.J[Jnz] = Jr[:Jcnz]
+            s.J = s.J * s.sigma                                                             # Reservoir connectivity strengths
         unnec = np.random.uniform(size=2090)                                                # Hard-coded for N=1000, to make it equivalent to matlab
 
-
         # Build network
         s.Q = (np.random.rand(s.n_out, s.N) * 2 - 1).T                                      # Reservoir feedback connectivity
         s.x = np.random.rand(s.N, 1) - .5 * np.ones((s.N, 1))                               # Reservoir voltages
-        s.r = np.tanh(s.x)                                                                  # Resevoir  output activity
-        s.z = np.zeros((s.n_out, 1))                                                        # Reservoir output
-        s.W_RMHL = np.zeros((s.n_out, s.N))                                                 # RMHL readout weights
+        s.rng_state = np.random.get_state()                                                 # Random state after building the reservoir
 
 
-        # Training initialisations
-        s.outputs = np.column_stack((_data['x'], _data['y']))
-        s.outputs = s.outputs.reshape((s.outputs.shape[0], 2, 1))
-        s.e = 0
-        s.e_bar = 0
-        s.z_RMHL_bar = np.zeros((s.n_out, 1))
-
-
-        # Plotting purposes
-        s.error = np.zeros((s.n_total_trials, s.n_timesteps))
-        s.cost_rec = np.zeros((s.n_total_trials, s.n_timesteps))
-        s.z_rec = np.zeros((s.n_out, s.n_total_trials, s.n_timesteps, 1))
-        s.z_RMHL_rec = np.zeros((s.n_out, s.n_total_trials, s.n_timesteps, 1))
-        s.hz_rec = np.zeros((2, s.n_total_trials, s.n_timesteps, 1))
-        s.W_RMHL_rec = np.zeros((s.n_total_trials, s.n_timesteps))
+    def decay(s, tau):
+        """
+            Coefficient c of a low pass filter of time constant tau over one timestep, y = y + c*(-y + u):
+            dT/tau with Euler integration, or the exact decay 1 - exp(-dT/tau) with exponential Euler integration.
+        """
 
+        if s.integrator == 'exponential':   return float(1 - np.exp(-s.dT/tau))
+        else:                               return s.dT/tau
 
 
+    @profiled('train')
     def train(s, task):
         """ Training the model using the RMHL algorithm. """
 
         # Online training
         print('Training')
-        for trial_num in tqdm(range(s.n_train_trials)):
+        for _ in s.stream(task, 'train'):   pass
+        print('Training done')
+
+
+    def stream(s, task, phase, block=None, trials=None):
+        """
+            Simulates the training or testing trials (phase) as a generator, which yields the record of each block of `block`
+            timesteps (default a trial; the last block of a trial may be shorter) as (trial_num, time_steps, trace), where
+            time_steps is the slice of the timesteps of the block and trace holds their error, cost, outputs and norms of the
+            readout weights, as arrays (n_steps[, n_out]) by name of the saved array, valid until the next record.
+            Each trial is streamed to the filters and the recorder at its end (see end_trial), and training stops once converged.
+            trials are the trials simulated (default all those of the phase), e.g. from a checkpoint (see replay.py).
+        """
+
+        block  = block or s.n_timesteps
+        if trials is None:  trials = range(s.n_train_trials) if phase == 'train' else range(s.n_train_trials, s.n_total_trials)
+        for trial_num in tqdm(trials):
+            if s.checkpoints and trial_num % s.checkpoints == 0:    Checkpoint.save(s, trial_num)
             for time_step in range(s.n_timesteps):
+                if phase == 'train':
+                    u_r = np.random.uniform(0, 1, (s.N, 1))
+                    u_z = np.random.uniform(0, 1, (s.n_out, 1))
+                    s.train_step(task, trial_num, time_step, u_r, u_z)
+                else:
+                    s.test_step(task, trial_num, time_step)
+                if (time_step+1) % block == 0 or time_step == s.n_timesteps-1:
+                    start = time_step - time_step % block
+                    yield trial_num, slice(start, time_step+1), {key: a[start:time_step+1] for key, a in s.trace.items()}
+            s.end_trial(trial_num, phase)
+            if phase == 'train' and s.converged(trial_num):
+                s.stop(trial_num)
+                break
+
+
+    def end_trial(s, trial_num, phase):
+        """ Streams the trace of a completed trial to the filters and the recorder, and keeps its output to be fed back while testing. """
+
+        t0 = clock()
+        s.recorder.write(trial_num, dict(s.trace, **s.filters.update(trial_num, s.trace)))
+        s.z_past[trial_num % 5] = s.trace['z']
+        if s.projection is not None:    s.projection.end_trial()
+        for a in s.trace.values():  a[:] = 0                                                # As recorded if the next trial is aborted
+        s.trial = trial_num + 1
+        s.profile.add(phase + '.filters', t0)
+
+
+    def converged(s, trial_num):
+        """
+            Early stopping criterion (see Filters.converged), checked at the end of each training trial but the last,
+            from the 5th on as testing replays the outputs of 5 trials before.
+        """
 
-                # Update reservoir state
-                s.x     = s.x + (s.leak)*(-s.x +np.dot(s.J,s.r) + np.dot(s.Q,s.z))
-                xi_r    = np.random.uniform(0, 1, (s.N, 1)) * s.alpha * 2 - s.alpha
-                s.r     = np.tanh(s.x) + xi_r
-
-                # Compute output at current timestep
-                t_psi   = task.psi(s.e_bar, trial_num, time_step)
-                xi_z    = np.random.uniform(0, 1, (s.n_out, 1)) * t_psi * 2 - t_psi
-                z_RMHL  = np.dot(s.W_RMHL, s.r) + xi_z
-                s.z     = z_RMHL
-                hz      = task.h(s.z)
-
-                # Computing high pass filtered values for output
-                s.z_RMHL_bar = (1 - s.dT/s.tau_z) * s.z_RMHL_bar + s.dT/s.tau_z * z_RMHL
-                if trial_num==0 and time_step==0:   s.z_RMHL_bar = z_RMHL                   # Can be removed
-                z_RMHL_hat   = z_RMHL - s.z_RMHL_bar
-
-                # Computing error and its high pass filtered values
-                cost    = task.cost(s.z - s.z_RMHL_bar)                                     # As per authors
-                ze      = hz-s.outputs[time_step]
-                s.e     = np.sum(ze ** 2) + cost
-                s.e_bar = (1 - s.dT) * s.e_bar + s.dT * s.e
-                if trial_num == 0 and time_step == 0:   s.e_bar = s.e                       # Can be removed
-                e_hat   = s.e-s.e_bar
-
-                # Update readout weights
-                s.W_RMHL += s.learningrate * task.phi(e_hat) * np.dot(z_RMHL_hat,s.r.T) * task.compensation('RMHL')
-
-                # Recording purposes
-                s.error[trial_num, time_step]           = s.e
-                s.cost_rec[trial_num, time_step]        = cost
-                s.hz_rec[:, trial_num, time_step]       = hz[:]
-                s.z_rec[:, trial_num, time_step]        = s.z[:]
-                s.z_RMHL_rec[:, trial_num, time_step]   = z_RMHL[:]
-                s.W_RMHL_rec[trial_num, time_step]      = task.norm(s.W_RMHL)
+        if trial_num < 4 or trial_num == s.n_train_trials-1:   return False
+        return s.filters.converged(trial_num, s.stop_error, s.stop_steps, s.stop_delta)
 
 
-        print('Training done')
+    def stop(s, trial_num):
+        """ Ends training at the end of trial trial_num: the testing trials follow it, and the later trials are dropped. """
+
+        s.n_train_trials    = trial_num + 1
+        s.n_total_trials    = s.n_train_trials + s.n_test_trials
+        s.recorder.trim(s.n_total_trials)
+        s.filters.trim(s.n_total_trials)
+        print('Training converged after', s.n_train_trials, 'trials')
+
+
+    def train_step(s, task, trial_num, time_step, u_r, u_z):
+        """
+            One timestep of RMHL training.
+            u_r and u_z are the uniform random numbers drawn for the reservoir and exploratory noise at this timestep.
+        """
 
+        t0      = clock()
+
+        # Update reservoir state
+        s.x     = s.x + (s.leak)*(-s.x +s.J.dot(s.r) + np.dot(s.Q,s.z))
+        xi_r    = (u_r * s.alpha * 2 - s.alpha).astype(s.dtype, copy=False)
+        s.r     = np.tanh(s.x) + xi_r
+
+        # Compute output at current timestep
+        t_psi   = task.psi(s.e_bar, trial_num, time_step)
+        xi_z    = (u_z * t_psi * 2 - t_psi).astype(s.dtype, copy=False)
+        z_RMHL  = np.dot(s.W_RMHL, s.r) + xi_z
+        s.z     = z_RMHL
+        hz      = task.h(s.z)
+
+        # Computing high pass filtered values for output
+        s.z_RMHL_bar = (1 - s.c_z) * s.z_RMHL_bar + s.c_z * z_RMHL
+        if trial_num==0 and time_step==0:   s.z_RMHL_bar = z_RMHL                           # Can be removed
+        z_RMHL_hat   = z_RMHL - s.z_RMHL_bar
+
+        # Computing error and its high pass filtered values
+        cost    = task.cost(s.z - s.z_RMHL_bar)                                             # As per authors
+        ze      = hz-s.outputs[time_step]
+        s.e     = np.sum(ze ** 2) + cost
+        s.e_bar = (1 - s.c_bar) * s.e_bar + s.c_bar * s.e
+        if trial_num == 0 and time_step == 0:   s.e_bar = s.e                               # Can be removed
+        e_hat   = s.e-s.e_bar
+
+        # Update readout weights
+        s.W_RMHL += s.learningrate * task.phi(e_hat) * np.dot(z_RMHL_hat,s.r.T) * task.compensation('RMHL')
+
+        # Divergence watchdog
+        if s.watchdog_steps and (time_step+1)%s.watchdog_steps == 0:    check(s, trial_num, time_step, s.watchdog_bound)
+
+        # Recording purposes
+        t_rec = clock()
+        s.trace['error'][time_step]             = s.e
+        s.trace['cost'][time_step]              = cost
+        s.trace['hz'][time_step]                = hz[:, 0]
+        s.trace['z'][time_step]                 = s.z[:, 0]
+        s.trace['z_RMHL'][time_step]            = z_RMHL[:, 0]
+        if s.projection is not None:    s.trace['r_proj'][time_step] = s.projection.step(s.r, trial_num, time_step)
+        t_norm = s.profile.add('train.record', t_rec)
+        s.trace['W_RMHL'][time_step]            = task.norm(s.W_RMHL)
+        s.profile.add('train.norm', t_norm)
+        if s.snapshots is not None:     s.snapshots.step(s, trial_num * s.n_timesteps + time_step)
+        s.profile.add('train.step', t0)
+
+    @profiled('test')
     def test(s, task):
         """ Testing the stability of the RMHL algorithm. """
 
         # Testing
         print('Testing')
-        z_RMHL = np.zeros((s.n_out,1))
-        for trial_num in tqdm(range(s.n_train_trials, s.n_total_trials)):
-            for time_step in range(s.n_timesteps):
+        for _ in s.stream(task, 'test'):    pass
+
+
+    def test_step(s, task, trial_num, time_step):
+        """ One timestep of testing, the output of 5 trials before being fed back to the reservoir. """
+
+        t0 = clock()
 
-                # Update reservoir state
-                zt  = s.z_rec[:,trial_num-5,time_step]
-                s.x = s.x + (s.leak)*(-s.x +np.dot(s.J,s.r) + np.dot(s.Q,zt))
-                s.r = np.tanh(s.x)
+        # Update reservoir state
+        zt  = s.z_past[trial_num % 5, time_step, :, None]
+        s.x = s.x + (s.leak)*(-s.x +s.J.dot(s.r) + np.dot(s.Q,zt))
+        s.r = np.tanh(s.x)
 
-                # Compute output and error at current timestep
-                z_RMHL = np.dot(s.W_RMHL,s.r)
-                s.z     = z_RMHL
-                hz      = task.h(s.z)
+        # Compute output and error at current timestep
+        z_RMHL = np.dot(s.W_RMHL,s.r)
+        s.z     = z_RMHL
+        hz      = task.h(s.z)
 
-                # Computing high pass filtered values for output
-                s.z_RMHL_bar = (1 - s.dT) * s.z_RMHL_bar + s.dT * z_RMHL
-                if trial_num==0 and time_step==0:   s.z_RMHL_bar = z_RMHL                   # Can be removed
+        # Computing high pass filtered values for output
+        s.z_RMHL_bar = (1 - s.c_bar) * s.z_RMHL_bar + s.c_bar * z_RMHL
+        if trial_num==0 and time_step==0:   s.z_RMHL_bar = z_RMHL                           # Can be removed
 
-                # Computing error and cost
-                cost    = task.cost(np.abs(s.z - s.z_RMHL_bar))                             # As per authors
-                ze      = hz-s.outputs[time_step]
-                s.e     = np.sum(ze ** 2) + cost
+        # Computing error and cost
+        cost    = task.cost(np.abs(s.z - s.z_RMHL_bar))                                     # As per authors
+        ze      = hz-s.outputs[time_step]
+        s.e     = np.sum(ze ** 2) + cost
 
-                # Recording purposes
-                s.error[trial_num, time_step]           = s.e
-                s.cost_rec[trial_num, time_step]        = cost
-                s.hz_rec[:, trial_num, time_step]       = hz[:]
-                s.z_rec[:, trial_num, time_step]        = s.z[:]
-                s.z_RMHL_rec[:, trial_num, time_step]   = z_RMHL[:]
+        # Divergence watchdog
+        if s.watchdog_steps and (time_step+1)%s.watchdog_steps == 0:    check(s, trial_num, time_step, s.watchdog_bound)
 
+        # Recording purposes
+        t_rec = clock()
+        s.trace['error'][time_step]             = s.e
+        s.trace['cost'][time_step]              = cost
+        s.trace['hz'][time_step]                = hz[:, 0]
+        s.trace['z'][time_step]                 = s.z[:, 0]
+        s.trace['z_RMHL'][time_step]            = z_RMHL[:, 0]
+        if s.projection is not None:    s.trace['r_proj'][time_step] = s.projection.step(s.r, trial_num, time_step)
+        s.profile.add('test.record', t_rec)
+        s.profile.add('test.step', t0)
 
+
+    @profiled('save_results', write=True)
     def save_results(s, exp):
         """ Saves the results of the simulation. """
 
         print('Saving results')
-        np.savez(s.results_path + 'Data',
-                    error               = s.error,
-                    cost                = s.cost_rec,
-                    z                   = s.z_rec,
-                    z_RMHL              = s.z_RMHL_rec,
-                    hz                  = s.hz_rec,
-                    W_RMHL              = s.W_RMHL_rec,
-                    )
+        if s.trial < s.n_total_trials:  s.recorder.write(s.trial, s.trace)                  # Trial aborted by a divergence
+        arrays = dict(training=np.arange(s.n_total_trials) < s.n_train_trials, **s.filters.arrays())
+        if s.projection is not None:    arrays.update(s.projection.arrays(s.n_total_trials))
+        if s.snapshots is not None:     s.snapshots.save()
+        s.recorder.save(arrays)
 
+    @profiled('plot', write=True)
     def plot(s, exp, task):
         """
             Loads the saved results and plots an overall figure.
         """
 
         # Load dataset
-        data = np.load(exp['dataset_file'])
+        data = task.data
 
         target_coord = np.array((np.tile(data['x'], s.n_train_trials+s.n_test_trials),
                                    np.tile(data['y'], s.n_train_trials+s.n_test_trials)))
 
         # Load result arrays
-        _ = np.load(s.results_path + 'Data.npz')
-        _hz = _['hz']
-        _z = _['z']
-        _z_RMHL = _['z_RMHL']
+        _ = load_results(s.results_path + 'Data')
         _W_RMHL = _['W_RMHL']
-        _error = _['error']
-        _cost = _['cost']
-
-        # Low pass filter results
-        _cost = _cost.flatten()
-        _error = _error.flatten()
-        _z = np.reshape(_z, (s.n_out, _z[0].size))
         _W_RMHL = _W_RMHL.flatten()
-        _z_RMHL = np.reshape(_z_RMHL, (s.n_out, _z_RMHL[0].size))
-        _hz = np.reshape(_hz, (2, _hz[0].size))
-
-        cost_bar = np.copy(_cost)
-        mse_bar = np.copy(_error)
-        z_bar = np.copy(_z)
-        z_RMHL_bar = np.copy(_z_RMHL)
-        hz_bar = np.copy(_hz)
-        ce = s.dT / s.tau_e
-        cz = s.dT / s.tau_z
-
-        for i in np.arange(1, s.n_timesteps * s.n_total_trials):
-            z_bar[:, i]      = z_bar[:, i - 1]      + cz * (-z_bar[:, i - 1]      + _z[:, i])
-            z_RMHL_bar[:, i] = z_RMHL_bar[:, i - 1] + cz * (-z_RMHL_bar[:, i - 1] + _z_RMHL[:, i])
-            hz_bar[:, i]     = hz_bar[:, i - 1]     + cz * (-hz_bar[:, i - 1]     + _hz[:, i])
-            mse_bar[i]       = mse_bar[i - 1]       + ce * (-mse_bar[i - 1]       + _error[i])
-            cost_bar[i]      = cost_bar[i - 1]      + ce * (-cost_bar[i - 1]      + _cost[i])
+
+        # Low pass filtered results, computed online (or here, for results saved without them)
+        _bar = _ if 'error_bar' in _ else s.filters.offline(_)
+        cost_bar   = _bar['cost_bar'].flatten()
+        mse_bar    = _bar['error_bar'].flatten()
+        z_bar      = _bar['z_bar'].reshape(-1, s.n_out).T
+        z_RMHL_bar = _bar['z_RMHL_bar'].reshape(-1, s.n_out).T
+        hz_bar     = _bar['hz_bar'].reshape(-1, 2).T
         mse = np.sqrt(mse_bar)
 
         # Adjusting for uncalculated W_FORCE norms and NANs/INF while calculating norm
@@ -362,48 +516,30 @@ class ModelRMHL():
         print('Done.')
         # ------------------------------------------------------------------- #
 
+    @profiled('plot_distinct', write=True)
     def plot_distinct(s, exp, task):
         """
             Loads the saved results and plots individual figures.
         """
 
         # Load dataset
-        data = np.load(exp['dataset_file'])
+        data = task.data
         target_coord = np.array((np.tile(data['x'], s.n_train_trials+s.n_test_trials),
                                    np.tile(data['y'], s.n_train_trials+s.n_test_trials)))
 
         # Load result arrays
         # _ = np.load(s.results_file + '.npz')
-        _ = np.load(s.results_path + 'Data' + '.npz')
-        _hz = _['hz']
-        _z = _['z']
-        _z_RMHL = _['z_RMHL']
+        _ = load_results(s.results_path + 'Data')
         _W_RMHL = _['W_RMHL']
-        _error = _['error']
-        _cost = _['cost']
-
-        # Low pass filter results
-        _cost = _cost.flatten()
-        _error = _error.flatten()
-        _z = np.reshape(_z, (s.n_out, _z[0].size))
         _W_RMHL = _W_RMHL.flatten()
-        _z_RMHL = np.reshape(_z_RMHL, (s.n_out, _z_RMHL[0].size))
-        _hz = np.reshape(_hz, (2, _hz[0].size))
-
-        cost_bar = np.copy(_cost)
-        mse_bar = np.copy(_error)
-        z_bar = np.copy(_z)
-        z_RMHL_bar = np.copy(_z_RMHL)
-        hz_bar = np.copy(_hz)
-        ce = s.dT / s.tau_e
-        cz = s.dT / s.tau_z
-
-        for i in np.arange(1, s.n_timesteps * s.n_total_trials):
-            z_bar[:, i]      = z_bar[:, i - 1]      + cz * (-z_bar[:, i - 1]      + _z[:, i])
-            z_RMHL_bar[:, i] = z_RMHL_bar[:, i - 1] + cz * (-z_RMHL_bar[:, i - 1] + _z_RMHL[:, i])
-            hz_bar[:, i]     = hz_bar[:, i - 1]     + cz * (-hz_bar[:, i - 1]     + _hz[:, i])
-            mse_bar[i]       = mse_bar[i - 1]       + ce * (-mse_bar[i - 1]       + _error[i])
-            cost_bar[i]      = cost_bar[i - 1]      + ce * (-cost_bar[i - 1]      + _cost[i])
+
+        # Low pass filtered results, computed online (or here, for results saved without them)
+        _bar = _ if 'error_bar' in _ else s.filters.offline(_)
+        cost_bar   = _bar['cost_bar'].flatten()
+        mse_bar    = _bar['error_bar'].flatten()
+        z_bar      = _bar['z_bar'].reshape(-1, s.n_out).T
+        z_RMHL_bar = _bar['z_RMHL_bar'].reshape(-1, s.n_out).T
+        hz_bar     = _bar['hz_bar'].reshape(-1, 2).T
         mse = np.sqrt(mse_bar)
 
         # Adjusting for uncalculated W_FORCE norms and NANs/INF while calculating norm
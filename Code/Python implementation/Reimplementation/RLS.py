@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+    This script belongs to a reimplementation of the models described in -
+    Pyle, R. and Rosenbaum, R., 2019.
+    A reservoir computing model of reward-modulated motor learning and automaticity.
+    Neural computation, 31(7), pp.1430-1461.
+
+    This script creates the low-rank estimate of the inverse correlation matrix P, used by the FORCE and SUPERTREX readouts
+    when the exact N x N matrix does not fit in memory.
+
+"""
+
+import numpy as np
+
+
+class LowRankP:
+    """
+        Inverse correlation estimate P = I/gamma - U.U^T, where U has at most 2*rank columns.
+        Each RLS update appends one column to U; when U is full, it is compressed back to its leading rank directions,
+        which keeps P positive definite (only positive terms of the correction are dropped).
+        Memory is O(n*rank) and the amortised cost of an update is O(n*rank).
+    """
+
+    def __init__(s, n, gamma, rank):                                                        # self -> s
+        """
+            Initialise P = I/gamma.
+
+            n     : size of P (no. of readout neurons)
+            gamma : initialising factor for P matrix
+            rank  : no. of directions of the correction kept after compression
+        """
+
+        s.gamma = gamma
+        s.rank  = rank
+        s.U     = np.zeros((n, 2*rank))                                                     # Correction directions
+        s.m     = 0                                                                         # No. of columns of U in use
+
+
+    def dot(s, r):
+        """ Product P.r """
+
+        U = s.U[:, :s.m]
+        return r / s.gamma - np.dot(U, np.dot(U.T, r))
+
+
+    def downdate(s, Pr, c):
+        """ RLS update P -= c * Pr.Pr^T """
+
+        if s.m == s.U.shape[1]:     s.compress()
+        s.U[:, s.m] = Pr[:, 0] * np.sqrt(c)
+        s.m += 1
+
+
+    def compress(s):
+        """ Truncates U.U^T to its leading rank directions. """
+
+        Q, R = np.linalg.qr(s.U[:, :s.m])
+        V, sv, _ = np.linalg.svd(R)
+        s.U[:, :s.rank] = np.dot(Q, V[:, :s.rank] * sv[:s.rank])
+        s.U[:, s.rank:] = 0
+        s.m = s.rank
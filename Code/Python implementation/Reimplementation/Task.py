@@ -13,6 +13,7 @@
     
 """
 
+import os
 import numpy as np
 
 
@@ -52,6 +53,7 @@ class Task:
                     tau_w           : time constant of weight updation
                     tau_e           : low pass filter for MSE
                     tau_z           : low pass filter for z
+                    compensation    : factor of the RMHL weight updates, instead of that of the task (optional)
         """
         
         # Task parameters
@@ -63,10 +65,10 @@ class Task:
         self.arm_segs   = np.array(exp['arm_len'],  ndmin=2)
         self.arm_cost   = np.array(exp['arm_cost'], ndmin=2)
         self.n_segs     = exp['n_segs']
+        self.compensation_factor = parameters.get('compensation', None)
 
         # Task data points
         self.build_dataset(parameters)
-        self.data = np.load(self.task_file)
         
         
     def build_dataset(self, parameters):
@@ -98,8 +100,13 @@ class Task:
         yout = 9 - np.sin(theta) + 2 * np.sin(3 * theta) + 2 * np.sin(5 * theta) - np.sin(7 * theta) + 3 * np.cos(2 * theta) - 2 * np.cos(4 * theta)
         yout = yout * np.sin(theta) / 14.4734
 
-        # Save in file
-        np.savez(self.task_file, x=xout, y=yout)
+        # Kept in memory, as simulations in parallel (e.g. sweep.py) may overwrite the file for another timespan or dT
+        self.data = {'x': xout, 'y': yout}
+
+        # Save in file, replaced at once as simulations in parallel may be reading it
+        _tmp = os.path.splitext(self.task_file)[0] + '.' + str(os.getpid()) + '.npz'
+        np.savez(_tmp, x=xout, y=yout)
+        os.replace(_tmp, self.task_file)
 
         
     def h(self, z):
@@ -172,6 +179,7 @@ class Task:
     def compensation(self, learning_rule):
         """ Arbitrary function to compensate for exploding values of weights. """
 
+        if self.compensation_factor is not None:    return self.compensation_factor
         # Change #3: Author code has compensation only in RMHL
         if self.type == 3:  return 0.5  # Where is this 0.5 mentioned in the paper?
         else:               return 1
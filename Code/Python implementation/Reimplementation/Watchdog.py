@@ -0,0 +1,37 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+    This script belongs to a reimplementation of the models described in -
+    Pyle, R. and Rosenbaum, R., 2019.
+    A reservoir computing model of reward-modulated motor learning and automaticity.
+    Neural computation, 31(7), pp.1430-1461.
+
+    This script checks that a simulation has not diverged: the reservoir state x, the output z, the readout weights
+    and the P matrix must be finite and bounded. The models check it every few timesteps, as given in the parameter file by:
+        watchdog_ms     : time (ms) between two checks, 0 to disable (optional, default 20, i.e. 100 timesteps at dT = 0.2)
+        watchdog_bound  : bound on the absolute values (optional, default 1e6)
+    A diverged simulation is aborted; its partial results are saved and the reason is recorded in the catalogue.
+
+"""
+
+import numpy as np
+
+
+class Divergence(Exception):
+    """ Raised when a simulation diverges, with the reason. """
+
+
+def check(model, trial_num, time_step, bound):
+    """ Raises Divergence if the state, output, readout weights or P matrix of model are not finite or exceed bound. """
+
+    arrays = {'x': model.x, 'z': model.z}
+    for key in ['W_FORCE', 'W_RMHL', 'P']:
+        if hasattr(model, key):     arrays[key] = getattr(model, key)
+    if 'P' in arrays and not isinstance(arrays['P'], np.ndarray):
+        arrays['P'] = arrays['P'].U[:, :arrays['P'].m]                                      # Low-rank estimate, through its correction
+
+    for key, a in arrays.items():
+        peak = np.max(np.abs(a)) if a.size else 0.                                          # NaN if any value is NaN
+        where = ' at trial ' + str(trial_num) + ', timestep ' + str(time_step)
+        if not np.isfinite(peak):   raise Divergence(key + ' is not finite' + where)
+        if peak > bound:            raise Divergence('|' + key + '| reached %.3g' % peak + where)
@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+    This script belongs to a reimplementation of the models described in -
+    Pyle, R. and Rosenbaum, R., 2019.
+    A reservoir computing model of reward-modulated motor learning and automaticity.
+    Neural computation, 31(7), pp.1430-1461.
+
+    This script checks that a candidate engine gives the results of the reference model, as described by a task descriptor
+    file and a parameter file. The candidate is the model with some parameters set (e.g. sparse_J, rls, dtype), and/or
+    another class with the interface of the models (e.g. an optimised subclass), given as <module>.<class>.
+    Both are built on the same seed and simulated in lockstep, drawing the random numbers of each training timestep once,
+    for 5 training trials and 1 testing trial of a short timespan. After each timestep, the reservoir state x, the output z,
+    the readout weights (W_FORCE, W_RMHL) and the error are compared: an array diverges when, for any of its values,
+    |candidate - reference| > atol + rtol * |reference|. The first divergence of each array is reported, with its largest
+    difference over the simulation, and the script exits with status 1 if any array diverged, or if only one of the
+    simulations was aborted by the divergence watchdog (see Watchdog.py).
+    Each folder holds its own rule set, so run it in both Reimplementation and Modified Reimplementation.
+    To run: python3 equivalence.py --parameters="<path_to_parameter_file.json>" --experiment="<path_to_experiment_file.json>"
+                                   [--set='{"sparse_J": true}'] [--engine=<module>.<class>] [--rtol=1e-6] [--atol=1e-9]
+    Several pairs of parameter and experiment files can be given, in the same order.
+
+"""
+
+import argparse, contextlib, importlib, io, json, shutil, sys, tempfile
+import numpy as np
+from ModelFORCE import ModelFORCE
+from ModelRMHL import ModelRMHL
+from ModelSUPERTREX import ModelSUPERTREX
+from Task import Task
+from Watchdog import Divergence
+from run import verify
+
+
+models   = {'FORCE': ModelFORCE, 'RMHL': ModelRMHL, 'SUPERTREX': ModelSUPERTREX}
+compared = ['x', 'z', 'W_FORCE', 'W_RMHL']                                                  # Arrays of the state compared, besides the error
+
+
+def state(model, trial_num, time_step):
+    """ Arrays compared after a timestep. """
+
+    arrays = {key: getattr(model, key) for key in compared if hasattr(model, key)}
+    arrays['error'] = model.trace['error'][time_step]
+    return arrays
+
+
+def differences(reference, candidate, rtol, atol):
+    """ Largest absolute difference of each array, and whether it diverged (NaN diverges). """
+
+    out = {}
+    for key, r in reference.items():
+        c = candidate.get(key)
+        if c is None or np.shape(c) != np.shape(r):
+            out[key] = (np.inf, True)
+            continue
+        r, c = np.asarray(r, dtype=float), np.asarray(c, dtype=float)
+        d = np.abs(c - r)
+        out[key] = (float(np.max(d)) if d.size else 0., not np.all(d <= atol + rtol * np.abs(r)))
+    return out
+
+
+def advance(model, task, trial_num, time_step, u_r, u_z, training):
+    """ Simulates a timestep of a model, and returns the reason of its divergence (see Watchdog.py), or None. """
+
+    try:
+        if training:    model.train_step(task, trial_num, time_step, u_r, u_z)
+        else:           model.test_step(task, trial_num, time_step)
+    except Divergence as e:
+        return str(e)
+
+
+def simulate(exp, parameters, candidate_parameters, Engine, rtol, atol):
+    """
+        Simulates the reference and candidate in lockstep, and returns the first divergence of each array,
+        as (phase, trial, timestep, difference), its largest difference, and the reasons of the divergence of
+        the reference and candidate simulations, aborted as soon as either diverges.
+    """
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        task      = Task(exp, parameters)
+        reference = models[exp['algorithm']](parameters, task, exp)
+        candidate = Engine(candidate_parameters, task, exp)
+
+    first, largest = {}, {}
+    draw_u_z = exp['algorithm'] != 'FORCE'                                                  # As by the train function of each model
+    u_r = u_z = None
+    for trial_num in range(reference.n_total_trials):
+        training = trial_num < reference.n_train_trials
+        for time_step in range(reference.n_timesteps):
+            if training:
+                u_r = np.random.uniform(0, 1, (reference.N, 1))
+                u_z = np.random.uniform(0, 1, (reference.n_out, 1)) if draw_u_z else None
+            failures = [advance(model, task, trial_num, time_step, u_r, u_z, training) for model in [reference, candidate]]
+            if any(failures):   return first, largest, failures
+
+            _differences = differences(state(reference, trial_num, time_step), state(candidate, trial_num, time_step), rtol, atol)
+            for key, (d, diverged) in _differences.items():
+                largest[key] = max(largest.get(key, 0.), d)
+                if diverged and key not in first:
+                    first[key] = ('train' if training else 'test', trial_num, time_step, d)
+        for model in [reference, candidate]:    model.end_trial(trial_num, 'train' if training else 'test')
+    return first, largest, [None, None]
+
+
+if __name__ == "__main__":
+
+    # Process arguments
+    parser = argparse.ArgumentParser(description='Checks a candidate engine against the reference models of the reimplementation of Rosenbaum 2019')
+    parser.add_argument('--parameters', default=['Descriptions/simulation_parameter_file_Task1_FORCE.json'], type=str, nargs='+', help='Path of parameter file(s).')
+    parser.add_argument('--experiment', default=['Descriptions/task_parameter_file_Task1_FORCE.json'], type=str, nargs='+', help='Path of experiment description file(s), in the order of the parameter files.')
+    parser.add_argument('--set', default={}, type=json.loads, help='Parameters of the candidate, as json, e.g. \'{"sparse_J": true}\'.')
+    parser.add_argument('--engine', default=None, type=str, help='Class of the candidate, as <module>.<class> (default: the model of the algorithm).')
+    parser.add_argument('--timespan', default=100, type=int, help='Duration (ms) of a trial.')
+    parser.add_argument('--rseed', default=5489, type=int, help='Seed of the simulations, for a random seed (rseed=0) in the experiment file.')
+    parser.add_argument('--rtol', default=1e-6, type=float, help='Relative tolerance.')
+    parser.add_argument('--atol', default=1e-9, type=float, help='Absolute tolerance.')
+    args = parser.parse_args()
+
+    assert len(args.parameters) == len(args.experiment),    "one parameter file is needed per experiment file."
+    if args.engine is not None:
+        module, _class = args.engine.rsplit('.', 1)
+        Engine = getattr(importlib.import_module(module), _class)
+
+    # Check each pair of files, in a temporary folder
+    folder = tempfile.mkdtemp()
+    n_diverged = 0
+    for parameter_file, exp_file in zip(args.parameters, args.experiment):
+        exp        = json.load(open(exp_file))
+        parameters = dict(json.load(open(parameter_file)), n_train_trials=5, n_test_trials=1)
+        exp        = dict(exp, rseed=exp['rseed'] or args.rseed, timespan=args.timespan, results_folder=folder,
+                          dataset_file=folder + '/butterfly_coords.npz')
+        candidate_parameters = dict(parameters, **args.set)
+        verify([exp], [parameters])
+        verify([exp], [candidate_parameters])
+        assert candidate_parameters['dT'] == parameters['dT'],  "the candidate must have the same dT as the reference."
+
+        first, largest, failures = simulate(exp, parameters, candidate_parameters,
+                                           models[exp['algorithm']] if args.engine is None else Engine, args.rtol, args.atol)
+
+        print(exp['algorithm'], 'on', exp_file, 'with', parameter_file)
+        for key in largest:
+            if key in first:    print('    %-8s diverged at %s trial %d, timestep %d (%.3g); largest difference %.3g' % ((key,) + first[key] + (largest[key],)))
+            else:               print('    %-8s equivalent; largest difference %.3g' % (key, largest[key]))
+        for model, failure in zip(['reference', 'candidate'], failures):
+            if failure is not None:     print('    %s aborted: %s' % (model, failure))
+        if first:
+            phase, trial_num, time_step, _ = min(first.values(), key=lambda f: (f[1], f[2]))
+            print('    first divergence at %s trial %d, timestep %d' % (phase, trial_num, time_step))
+        n_diverged += bool(first) or (failures[0] is None) != (failures[1] is None)                 # Both aborted at the same timestep is equivalent
+    shutil.rmtree(folder)
+
+    if n_diverged:
+        print(n_diverged, 'of', len(args.parameters), 'simulations diverged')
+        sys.exit(1)
@@ -11,41 +11,96 @@
 
     This script loads the json descriptor files with the task and simulation parameters and creates the experiment object.
     To run: python3 run.py --parameters="<path_to_parameter_file.json>" --experiment="<path_to_experiment_file.json>"
+    To compare algorithms on common random numbers, give one parameter file per experiment file, in the same order.
+    Completed simulations are not run again; with a random seed (rseed=0), number the repeated simulations with --repeat=<i>.
 
 """
 
 import argparse, json
-from Experiment import Experiment
+from Experiment import Experiment, Comparison
+from Hooks import builtin
+
+
+supp_fig_file_types = ['ps', 'eps', 'pdf', 'pgf', 'png', 'raw', 'rgba', 'svg', 'svgz', 'jpg', 'jpeg', 'tif', 'tiff']
+
+
+def verify(exps, parameters):
+    """ Verifies the experiment and parameter files, and that compared simulations share the task, the seed and the reservoir. """
+
+    assert len(exps) == len(parameters),                        "one parameter file is needed per experiment file."
+    for exp, params in zip(exps, parameters):
+        assert exp['algorithm'] in ['FORCE', 'RMHL', 'SUPERTREX'],  "algorithm must be FORCE, RMHL or SUPERTREX."
+        assert exp['task_type'] in [1, 2, 3],                       "task_type must be 1, 2 or 3."
+        assert exp['n_segs'] > 0,                                   "n_seg must be greater than zero."
+        assert len(exp['arm_len']) == exp['n_segs'],                "arm_len size " + str(len(exp['arm_len'])) + " is not the same as n_seg."
+        assert len(exp['arm_cost']) == exp['n_segs'],               "arm_cost size " + str(len(exp['arm_cost'])) + " is not the same as n_seg."
+        assert exp['display_plot'] in ['Yes', 'No'],                "display_plot must be Yes or No"
+        assert exp['plot_format'] in supp_fig_file_types,           "plot_format must be a valid image format for savefig: " + str(supp_fig_file_types)
+        assert exp.get('results_format', 'npz') in ['npz', 'npy'],  "results_format must be npz or npy."
+        assert exp.get('results_compression', 'none') in ['none', 'zlib'], "results_compression must be none or zlib."
+        assert exp.get('results_compression', 'none') == 'none' or exp.get('results_format', 'npz') == 'npy', "results_compression requires results_format npy."
+        assert exp.get('results_trace_dtype', 'float64') in ['float64', 'float32', 'float16'], "results_trace_dtype must be float64, float32 or float16."
+        assert exp.get('results_raw', 'Yes') in ['Yes', 'No'],      "results_raw must be Yes or No."
+        assert exp.get('results_window', 1) >= 1,                   "results_window must be greater than zero."
+        assert exp.get('results_decimate', 10) >= 0,                "results_decimate must be positive or zero."
+        assert exp.get('results_checkpoints', 0) >= 0,              "results_checkpoints must be positive or zero."
+        assert exp.get('results_projection', 'random') in ['random', 'pca'], "results_projection must be random or pca."
+        assert 0 < exp.get('results_projection_dim', 1) <= params['N'], "results_projection_dim must be between 1 and N."
+        assert exp.get('results_weights', 0) >= 0,                  "results_weights must be positive or zero."
+        assert params['n_train_trials'] >= 5 or params.get('training', 'online') == 'batch', "n_train_trials must be greater than 4 (0 for batch training)."
+        assert params.get('training', 'online') in ['online', 'batch'], "training must be online or batch."
+        assert 0 < params.get('n_readout', params['N']) <= params['N'], "n_readout must be between 1 and N."
+        assert params.get('rls', 'exact') in ['exact', 'lowrank'],  "rls must be exact or lowrank."
+        assert params.get('rls_rank', 100) > 0,                     "rls_rank must be greater than zero."
+        assert params.get('integrator', 'euler') in ['euler', 'exponential'], "integrator must be euler or exponential."
+        assert params.get('dtype', 'float64') in ['float64', 'float32'], "dtype must be float64 or float32."
+        assert params.get('stop_error', 1) > 0,                     "stop_error must be greater than zero."
+        assert params.get('stop_steps', 1) >= 1,                    "stop_steps must be greater than zero."
+        assert params.get('stop_delta', 1) > 0,                     "stop_delta must be greater than zero."
+        assert params.get('watchdog_ms', 20) >= 0,                  "watchdog_ms must be positive or zero."
+        assert params.get('watchdog_bound', 1e6) > 0,               "watchdog_bound must be greater than zero."
+        assert all(h in builtin or '.' in h for h in params.get('hooks', {})), "hooks must be " + ', '.join(builtin) + " or <module>.<class>."
+        assert params.get('learningrate', 1) > 0,                   "learningrate must be greater than zero."
+        assert params.get('compensation', 1) > 0,                   "compensation must be greater than zero."
+        if params.get('training', 'online') == 'batch':
+            assert exp['algorithm'] == 'FORCE' and exp['task_type'] == 1, "batch training is only available for FORCE on task 1."
+            assert 'stop_error' not in params and 'stop_delta' not in params, "early stopping is not available for batch training."
+
+    # Verify that compared simulations share the task, the seed and the reservoir
+    for key in ['rseed', 'dataset_file', 'timespan', 'task_type', 'n_segs', 'arm_len', 'arm_cost']:
+        assert all(exp[key] == exps[0][key] for exp in exps),                  key + " must be the same in all compared experiment files."
+    for key in ['N', 'lmbda', 'sparsity', 'dT', 'n_train_trials', 'n_test_trials']:
+        assert all(params[key] == parameters[0][key] for params in parameters), key + " must be the same in all compared parameter files."
+    assert len(set(exp['results_folder'] for exp in exps)) == len(exps),       "results_folder must be different for each compared experiment file."
 
 
 if __name__ == "__main__":
 
     # Process arguments
     parser = argparse.ArgumentParser(description='Reimplementation of Rosenbaum 2019')
-    parser.add_argument('--parameters', default='Descriptions/simulation_parameter_file_Task1_FORCE', type=str, help='Path of parameter file.')
-    parser.add_argument('--experiment', default='Descriptions/task_parameter_file_Task1_FORCE', type=str, help='Path of experiment description file.')
+    parser.add_argument('--parameters', default=['Descriptions/simulation_parameter_file_Task1_FORCE'], type=str, nargs='+', help='Path of parameter file(s).')
+    parser.add_argument('--experiment', default=['Descriptions/task_parameter_file_Task1_FORCE'], type=str, nargs='+', help='Path of experiment description file(s). Several files are simulated together on common random numbers.')
+    parser.add_argument('--repeat', default=None, type=int, help='Index of a repeated simulation with a random seed (rseed=0), so that its completed results are reused.')
     
     args                = parser.parse_args()
-    arg_parameter_file  = args.parameters
-    arg_exp_file        = args.experiment
+    arg_parameter_files = args.parameters
+    arg_exp_files       = args.experiment
     
     # Load experiment and parameter files
-    exp        = json.load(open(arg_exp_file))
-    parameters = json.load(open(arg_parameter_file))
+    exps       = [json.load(open(f)) for f in arg_exp_files]
+    parameters = [json.load(open(f)) for f in arg_parameter_files]
     
     # Verify parameters
-    supp_fig_file_types = ['ps', 'eps', 'pdf', 'pgf', 'png', 'raw', 'rgba', 'svg', 'svgz', 'jpg', 'jpeg', 'tif', 'tiff']
-    assert exp['algorithm'] in ['FORCE', 'RMHL', 'SUPERTREX'],  "algorithm must be FORCE, RMHL or SUPERTREX."
-    assert exp['task_type'] in [1, 2, 3],                       "task_type must be 1, 2 or 3."
-    assert exp['n_segs'] > 0,                                   "n_seg must be greater than zero."
-    assert len(exp['arm_len']) == exp['n_segs'],                "arm_len size " + str(len(exp['arm_len'])) + " is not the same as n_seg."
-    assert len(exp['arm_cost']) == exp['n_segs'],               "arm_cost size " + str(len(exp['arm_cost'])) + " is not the same as n_seg."
-    assert exp['display_plot'] in ['Yes', 'No'],                "display_plot must be Yes or No"
-    assert exp['plot_format'] in supp_fig_file_types,           "plot_format must be a valid image format for savefig: " + str(supp_fig_file_types)
-    assert parameters['n_train_trials'] >= 5,                   "n_train_trials must be greater than 4."
+    verify(exps, parameters)
 
     
     # Simulate experiment
-    experiment = Experiment(exp, parameters)                                       # Initialise experiment
-    experiment.run(exp)                                                            # Comment if you want to replot previously saved results
-    experiment.plot(exp)                                                           # Plot results and saves figures
+    if len(exps) == 1:
+        experiment = Experiment(exps[0], parameters[0], args.repeat)               # Initialise experiment, or reuse its completed results
+        experiment.run(exps[0])                                                    # Comment if you want to replot previously saved results
+        experiment.plot(exps[0])                                                   # Plot results and saves figures
+        experiment.finish()                                                        # Record the run as completed, to be reused
+    else:
+        experiment = Comparison(exps, parameters)                                  # Initialise experiments on common random numbers
+        experiment.run()                                                           # Comment if you want to replot previously saved results
+        experiment.plot()                                                          # Plot results and saves figures
@@ -0,0 +1,30 @@
+#!/bin/bash
+
+####-------------------------------------------------------------------------####
+
+### Compares the float32 simulation with the float64 one, on the seeds of the published results of each task
+
+### This script requires the json descriptors for the task and simulation parameteres to be provided in the Descriptions folder.
+
+### To run: bash run_dtype_study.sh
+
+####-------------------------------------------------------------------------####
+
+
+VARIANTS=('{"dtype": "float64"}' '{"dtype": "float32"}')
+
+# Seeds of the published results in a results folder
+seeds() { ls "$1" | grep _nsegs | cut -d_ -f1; }
+
+# Task 1
+python3 study.py --parameters="Descriptions/simulation_parameter_file_Task1_FORCE.json" --experiment="Descriptions/task_parameter_file_Task1_FORCE.json" --variants "${VARIANTS[@]}" --seeds $(seeds Results/FORCE_Task1)
+python3 study.py --parameters="Descriptions/simulation_parameter_file_Task1_RMHL.json" --experiment="Descriptions/task_parameter_file_Task1_RMHL.json" --variants "${VARIANTS[@]}" --seeds $(seeds Results/RMHL_Task1)
+python3 study.py --parameters="Descriptions/simulation_parameter_file_Task1_ST.json" --experiment="Descriptions/task_parameter_file_Task1_ST.json" --variants "${VARIANTS[@]}" --seeds $(seeds Results/SUPERTREX_Task1)
+
+# Task 2
+python3 study.py --parameters="Descriptions/simulation_parameter_file_Task2_RMHL.json" --experiment="Descriptions/task_parameter_file_Task2_RMHL_Seg2.json" --variants "${VARIANTS[@]}" --seeds $(seeds Results/RMHL_Task2_Seg2)
+python3 study.py --parameters="Descriptions/simulation_parameter_file_Task2_ST.json" --experiment="Descriptions/task_parameter_file_Task2_ST_Seg2.json" --variants "${VARIANTS[@]}" --seeds $(seeds Results/SUPERTREX_Task2_Seg2)
+
+# Task 3
+python3 study.py --parameters="Descriptions/simulation_parameter_file_Task3_RMHL.json" --experiment="Descriptions/task_parameter_file_Task3_RMHL.json" --variants "${VARIANTS[@]}" --seeds $(seeds Results/RMHL_Task3_01)
+python3 study.py --parameters="Descriptions/simulation_parameter_file_Task3_ST.json" --experiment="Descriptions/task_parameter_file_Task3_ST.json" --variants "${VARIANTS[@]}" --seeds $(seeds Results/SUPERTREX_Task3_01)
@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+    This script belongs to a reimplementation of the models described in -
+    Pyle, R. and Rosenbaum, R., 2019.
+    A reservoir computing model of reward-modulated motor learning and automaticity.
+    Neural computation, 31(7), pp.1430-1461.
+
+    This script sweeps the task and simulation parameters, as described in a sweep file where:
+        experiment  : path of the task descriptor file
+        parameters  : path of the parameter file
+        sweep       : list of the swept dimensions, whose values are combined (product). Each dimension holds the keys of the
+                      task ("experiment") and parameter ("parameters") files swept together (zip), with their values given
+                      as a list, {"range": [start, stop, step]}, {"linspace": [start, stop, num]} or {"geomspace": [start, stop, num]}
+    e.g. Descriptions/sweep_file_Task1_ST.json. Each point is verified as by run.py, simulated in its own results folder
+    <results_folder>/<sweep file name>/<point no.> (listed in points.json) and recorded in the catalogue.
+    Points on the same seed, N, sparsity and lmbda (and no. of outputs, sparse_J and dtype) build their reservoir once,
+    and these groups of points are simulated in parallel processes (see schedule, also used by search.py).
+    To run: python3 sweep.py <path_to_sweep_file.json> [--workers=<n>] [--plot] [--dry_run]
+
+"""
+
+import argparse, itertools, json, os, sys, types
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from Experiment import Experiment
+from run import verify
+
+
+def values(v):
+    """ Values of a swept key: a list, or a range, linspace or geomspace. """
+
+    if isinstance(v, list):     return v
+    (kind, args), = v.items()
+    if kind == 'range':
+        if all(isinstance(a, int) for a in args):   return list(range(*args))
+        start, stop, step = (list(args) + [1])[:3]
+        return [round(start + i * step, 12) for i in range(int(np.ceil((stop - start) / step - 1e-9)))]
+    elif kind == 'linspace':    return [float('%.12g' % x) for x in np.linspace(*args)]
+    elif kind == 'geomspace':   return [float('%.12g' % x) for x in np.geomspace(*args)]
+    raise ValueError('Unknown values ' + kind + ', must be a list, range, linspace or geomspace.')
+
+
+def expand(sweep):
+    """ Expands a sweep into its points, as (swept values, task description, parameters) for each combination. """
+
+    exp        = json.load(open(sweep['experiment']))
+    parameters = json.load(open(sweep['parameters']))
+
+    # Points of each dimension, with the keys swept together
+    dimensions = []
+    for dimension in sweep['sweep']:
+        assert set(dimension) <= {'experiment', 'parameters'},  "a swept dimension holds experiment and parameters keys only."
+        keys  = [section + '.' + key for section in ['experiment', 'parameters'] for key in dimension.get(section, {})]
+        lists = [values(dimension[section][key]) for section in ['experiment', 'parameters'] for key in dimension.get(section, {})]
+        assert len(set(len(l) for l in lists)) == 1,            "keys swept together must have the same no. of values: " + ', '.join(keys)
+        dimensions.append([dict(zip(keys, point)) for point in zip(*lists)])
+
+    # Combinations of the dimensions
+    points = []
+    for combination in itertools.product(*dimensions):
+        swept   = {key: v for point in combination for key, v in point.items()}
+        _exp    = dict(exp,        **{key.split('.', 1)[1]: v for key, v in swept.items() if key.startswith('experiment.')})
+        _params = dict(parameters, **{key.split('.', 1)[1]: v for key, v in swept.items() if key.startswith('parameters.')})
+        points.append((swept, _exp, _params))
+    return points
+
+
+def reservoir_key(exp, parameters):
+    """ Points with the same key build the same reservoir (see build_reservoir of the models). """
+
+    n_out = 2 if exp['task_type'] == 1 else exp['n_segs']
+    return (exp['rseed'], parameters['N'], parameters['sparsity'], parameters['lmbda'],
+            parameters.get('sparse_J', False), parameters.get('dtype', 'float64'), n_out)
+
+
+def simulate(points, plot=False):
+    """ Simulates points sharing one reservoir, in turn, and returns the results path and reason of divergence (None if completed) of each. """
+
+    reservoir, outcomes = None, []
+    for exp, parameters in points:
+        experiment = Experiment(exp, parameters, reservoir=reservoir)
+        if reservoir is None and not experiment.cached:
+            _m = experiment.model
+            reservoir = types.SimpleNamespace(J=_m.J, Q=_m.Q, x=np.copy(_m.x), rng_state=_m.rng_state)
+        experiment.run(exp)
+        if plot:    experiment.plot(exp)
+        experiment.finish()
+        outcomes.append((experiment.results_path, experiment.failure))
+    return outcomes
+
+
+def groups(points):
+    """ Indices of the points (task description, parameters) sharing each reservoir. """
+
+    _groups = {}
+    for i, (exp, parameters) in enumerate(points):  _groups.setdefault(reservoir_key(exp, parameters), []).append(i)
+    return list(_groups.values())
+
+
+def schedule(points, workers=None, plot=False):
+    """
+        Simulates points (task description, parameters) in parallel processes, and returns the results path and reason of
+        divergence of each. The groups of points sharing a reservoir are split so that all the processes are busy.
+    """
+
+    _groups  = groups(points)
+    n_splits = max(1, (workers or os.cpu_count()) // len(_groups))
+    jobs     = [group[j::n_splits] for group in _groups for j in range(min(n_splits, len(group)))]
+
+    outcomes = [None] * len(points)
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for job, job_outcomes in zip(jobs, pool.map(simulate, [[points[i] for i in job] for job in jobs], [plot] * len(jobs))):
+            for i, outcome in zip(job, job_outcomes):   outcomes[i] = outcome
+    return outcomes
+
+
+if __name__ == "__main__":
+
+    # Process arguments
+    parser = argparse.ArgumentParser(description='Sweeps the parameters of the reimplementation of Rosenbaum 2019')
+    parser.add_argument('sweep', type=str, help='Path of sweep file.')
+    parser.add_argument('--workers', default=None, type=int, help='No. of processes simulating the points (default: no. of CPUs).')
+    parser.add_argument('--plot', action='store_true', help='Plots the results of each point.')
+    parser.add_argument('--dry_run', action='store_true', help='Lists the points without simulating them.')
+    args = parser.parse_args()
+
+    sweep  = json.load(open(args.sweep))
+    name   = os.path.splitext(os.path.basename(args.sweep))[0]
+    points = expand(sweep)
+
+    # Resolve the random seed (rseed=0) once, for all the points, and give each point its own results folder
+    rseed = np.random.randint(0,1e7)
+    for i, (swept, exp, params) in enumerate(points):
+        if exp['rseed'] == 0:   exp['rseed'] = rseed
+        exp['results_folder'] = os.path.join(exp['results_folder'], name, str(i))
+        verify([exp], [params])
+
+    print(len(points), 'points,', len(groups([point[1:] for point in points])), 'reservoirs')
+    for i, (swept, exp, params) in enumerate(points):
+        print('%4d  %s' % (i, json.dumps(swept)))
+    if args.dry_run:    sys.exit()
+
+    # List the points of the sweep
+    base = os.path.join(json.load(open(sweep['experiment']))['results_folder'], name)
+    if not os.path.exists(base):    os.makedirs(base)
+    with open(os.path.join(base, 'points.json'), 'w') as f:
+        json.dump([{'swept': swept, 'results_folder': exp['results_folder']} for swept, exp, params in points], f, indent=4)
+
+    # Simulate the points
+    outcomes = schedule([point[1:] for point in points], args.workers, args.plot)
+    for i, (results_path, failure) in enumerate(outcomes):
+        if failure is not None:     print('Point', i, 'diverged:', failure)
+    print('Sweep done; see the catalogue for the results (python3 query.py --runs)')